@@ -50,6 +50,14 @@ def read_args():
             "is a string or list."
         ),
     )
+    parser.add_argument(
+        "--query-cache",
+        help=(
+            "Directory to cache the results of queries of the reference "
+            "table in, so that they are only downloaded again once the "
+            "reference table changes."
+        ),
+    )
     parser.add_argument(
         "--log-level",
         default="INFO",
@@ -81,11 +89,15 @@ def parse_table_mapping(table_mapping):
     return table_mapping
 
 
-def get_relevant_healthcodes(syn, reference_table, study):
-    relevant_healthcodes = syn.tableQuery(
+def get_relevant_healthcodes(syn, reference_table, study, cache=None):
+    query = (
         f"SELECT distinct healthCode FROM {reference_table} "
         f"where substudyMemberships like '%{study}%'"
-    ).asDataFrame()
+    )
+    if cache is not None:
+        relevant_healthcodes = cache.query(syn, query)
+    else:
+        relevant_healthcodes = syn.tableQuery(query).asDataFrame()
     relevant_healthcodes = list(relevant_healthcodes.healthCode)
     return relevant_healthcodes
 
@@ -132,8 +144,11 @@ def main():
         table_mapping = list(table_mapping.keys())
     if args.study == "Cirrhosis_pilot":
         verify_no_new_table_versions(syn)
+    cache = None
+    if args.query_cache:
+        cache = synapsebridgehelpers.QueryResultCache(args.query_cache)
     relevant_healthcodes = get_relevant_healthcodes(
-        syn=syn, reference_table=args.reference_table, study=args.study
+        syn=syn, reference_table=args.reference_table, study=args.study, cache=cache
     )
     synapsebridgehelpers.export_tables(
         syn=syn,
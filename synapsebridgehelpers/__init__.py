@@ -1,4 +1,6 @@
-from .tableHelpers import query_across_tables, get_tables, find_tables_with_data
+from .tableHelpers import (query_across_tables, iter_query_across_tables,
+                           get_tables, find_tables_with_data, TableCatalog,
+                           get_shared_executor, shutdown_shared_executor)
 from .findHealthCodes import *
 from .filterTablesByActivity import *
 from .getFileIds import *
@@ -7,4 +9,12 @@ from .transferTables import *
 # from .tableStats import *
 from .summaryTable import *
 from .export_tables import (export_tables, compare_schemas, synchronize_schemas,
-                            replace_file_handles)
+                            replace_file_handles, TableExportError)
+from .export_state import ExportWatermarkStore, FileHandleCopyCache
+from .query_cache import QueryResultCache
+from .identity_index import IdentityIndex, ExternalIdIndex
+from .membership import HealthCodeMembership
+from .identifier_filters import (IdentifierFilter, Prefix, Suffix, Contains,
+                                 Range, Regex)
+from .compact import (compact_dataframe, concat_compact, combine_data_frames,
+                      DEFAULT_CATEGORICAL_COLUMNS)
@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+
+# Bridge columns whose values repeat across many rows
+DEFAULT_CATEGORICAL_COLUMNS = [
+    "healthCode",
+    "externalId",
+    "dataGroups",
+    "substudyMemberships",
+    "appVersion",
+    "phoneInfo",
+]
+
+# Synapse column types which may be stored as a narrower integer dtype
+_INTEGER_COLUMN_TYPES = {"INTEGER", "DATE"}
+
+
+def _narrow_integers(values):
+    """Store integer values in the narrowest dtype which can hold them,
+    using a nullable integer dtype if any values are missing."""
+    numeric = pd.to_numeric(values, errors="coerce")
+    present = numeric.dropna()
+    if len(present) == 0 and values.isna().all():  # e.g. an empty query chunk
+        return numeric.astype("Int8")
+    if (
+        len(present) == 0
+        or numeric.isna().sum() != values.isna().sum()  # not all numbers
+        or not (present == np.floor(present)).all()
+    ):
+        return values
+    low, high = int(present.min()), int(present.max())
+    # Synapse INTEGERs are signed 64 bit integers
+    for narrowest in (np.int8, np.int16, np.int32, np.int64):
+        if np.iinfo(narrowest).min <= low and high <= np.iinfo(narrowest).max:
+            break
+    else:
+        return values
+    narrowest = np.dtype(narrowest)
+    if len(present) == len(values):
+        return numeric.astype(narrowest)
+    return numeric.astype(str(narrowest).replace("int", "Int"))
+
+
+def compact_dataframe(
+    df, categorical_columns=DEFAULT_CATEGORICAL_COLUMNS, column_types=None
+):
+    """Reduce the memory used by a pandas DataFrame of Synapse table records.
+
+    Columns in `categorical_columns` (those which are in `df`) are converted
+    to categoricals, so that each distinct value is only stored once.
+    Integer columns, and columns listed as INTEGER or DATE in `column_types`,
+    are stored in the narrowest integer dtype which can hold their values,
+    and BOOLEAN columns without missing values are stored as booleans.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    categorical_columns : list, default DEFAULT_CATEGORICAL_COLUMNS
+    column_types : dict, default None
+        A mapping from column names to Synapse column types, e.g.
+        {c.name: c.columnType for c in syn.getTableColumns(table_id)}.
+
+    Returns
+    -------
+    A new pandas.DataFrame.
+    """
+    df = df.copy()
+    column_types = column_types or {}
+    for col in df.columns:
+        values = df[col]
+        column_type = column_types.get(col)
+        if col in categorical_columns:
+            df[col] = values.astype("category")
+        elif pd.api.types.is_datetime64_any_dtype(values.dtype):
+            continue
+        elif pd.api.types.is_integer_dtype(values.dtype) or (
+            column_type in _INTEGER_COLUMN_TYPES
+        ):
+            df[col] = _narrow_integers(values)
+        elif column_type == "BOOLEAN":
+            values = values.infer_objects()
+            if pd.api.types.is_bool_dtype(values.dtype):
+                df[col] = values
+    return df
+
+
+def concat_compact(dfs):
+    """Concatenate DataFrames returned by `compact_dataframe`, keeping
+    categorical columns categorical even if their categories differ."""
+    dfs = [df for df in dfs if df is not None]
+    categorical_columns = set(
+        col
+        for df in dfs
+        for col in df.columns
+        if isinstance(df[col].dtype, pd.CategoricalDtype)
+    )
+    for col in categorical_columns:
+        columns = [df[col] for df in dfs if col in df]
+        if not all(isinstance(c.dtype, pd.CategoricalDtype) for c in columns):
+            continue
+        categories = columns[0].cat.categories
+        for c in columns[1:]:
+            categories = categories.union(c.cat.categories)
+        dfs = [
+            (
+                df.assign(**{col: df[col].cat.set_categories(categories)})
+                if col in df
+                else df
+            )
+            for df in dfs
+        ]
+    return pd.concat(dfs)
+
+
+def _common_dtype(dtypes, complete):
+    """The dtype a column of values of each of `dtypes` is stored as, which
+    must be able to hold missing values unless the column is `complete`.
+    This is the dtype `pandas.concat` would give the column, e.g. Int16 for
+    Int8 and Int16 values, falling back to object for incompatible dtypes."""
+    dtype = pd.concat([pd.Series([], dtype=d) for d in dtypes]).dtype
+    if not complete and isinstance(dtype, np.dtype):
+        if dtype.kind in "iu":
+            return np.dtype(np.float64)
+        if dtype.kind == "b":
+            return np.dtype(object)
+    return dtype
+
+
+def _fill_value(dtype):
+    if dtype.kind in "mM":
+        return np.datetime64("NaT")
+    return np.nan
+
+
+def combine_data_frames(frames, source_col="originalTableId", dtype_backend=None):
+    """Combine the query results of several tables into a single DataFrame.
+
+    The schema of the combined DataFrame is determined once, from the
+    columns of every result, and each column is allocated once and filled
+    in place, rather than concatenating the results pairwise. Categorical
+    columns stay categorical, with the union of their categories. Columns
+    which are missing from some of the results are filled with missing
+    values there (so integers become floats, as with `pandas.concat`).
+
+    Parameters
+    ----------
+    frames : list of tuples
+        (Synapse ID, pandas.DataFrame or None) for each table. None
+        results are skipped.
+    source_col : str, default "originalTableId"
+        The name of the categorical column added to the combined DataFrame
+        holding the Synapse ID of the table each row came from.
+    dtype_backend : str, default None
+        If set (e.g. to "pyarrow", which requires pyarrow to be installed),
+        convert the combined DataFrame to this dtype backend with
+        `pandas.DataFrame.convert_dtypes`.
+
+    Returns
+    -------
+    A pandas.DataFrame. Its index is made of the indices of the results.
+    """
+    frames = [(table_id, df) for table_id, df in frames if df is not None]
+    lengths = [len(df) for _, df in frames]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(int)
+    n = int(offsets[-1])
+    columns = list(dict.fromkeys(c for _, df in frames for c in df.columns))
+    data = {}
+    for col in columns:
+        parts = [(i, df[col]) for i, (_, df) in enumerate(frames) if col in df]
+        dtypes = [values.dtype for _, values in parts]
+        if all(isinstance(d, pd.CategoricalDtype) for d in dtypes):
+            categories = dtypes[0].categories
+            for d in dtypes[1:]:
+                categories = categories.union(d.categories)
+            codes = np.full(n, -1, dtype=np.int32)
+            for i, values in parts:
+                recode = categories.get_indexer(values.cat.categories)
+                part_codes = values.cat.codes.to_numpy()
+                codes[offsets[i] : offsets[i + 1]] = np.where(
+                    part_codes == -1, -1, recode[part_codes]
+                )
+            data[col] = pd.Categorical.from_codes(codes, categories)
+            continue
+        # mixing categoricals with other values makes them plain values
+        dtypes = [
+            np.dtype(object) if isinstance(d, pd.CategoricalDtype) else d
+            for d in dtypes
+        ]
+        dtype = _common_dtype(dtypes, complete=len(parts) == len(frames))
+        if not isinstance(dtype, np.dtype):
+            # an extension dtype, e.g. strings or nullable integers
+            pieces = [
+                (
+                    frames[i][1][col].astype(dtype)
+                    if col in frames[i][1]
+                    else pd.Series(np.nan, index=frames[i][1].index, dtype=dtype)
+                )
+                for i in range(len(frames))
+            ]
+            data[col] = pd.concat(pieces, ignore_index=True).array
+            continue
+        combined = np.empty(n, dtype=dtype)
+        if len(parts) < len(frames):
+            combined[:] = _fill_value(dtype)
+        for i, values in parts:
+            combined[offsets[i] : offsets[i + 1]] = values.to_numpy(dtype=dtype)
+        data[col] = combined
+    data[source_col] = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(frames), dtype=np.int32), lengths),
+        categories=pd.Index([table_id for table_id, _ in frames], dtype=object),
+    )
+    if frames:
+        index = frames[0][1].index.append([df.index for _, df in frames[1:]])
+    else:
+        index = pd.RangeIndex(0)
+    combined = pd.DataFrame(
+        data, index=index, columns=columns + [source_col], copy=False
+    )
+    if dtype_backend is not None:
+        combined = combined.convert_dtypes(dtype_backend=dtype_backend)
+    return combined
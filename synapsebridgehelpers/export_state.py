@@ -0,0 +1,190 @@
+import os
+import sqlite3
+import contextlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# SQLite refuses statements with too many bound parameters
+# (999 in older builds), so membership lookups are split up.
+SQLITE_BATCH_SIZE = 500
+
+
+class _SQLiteStore:
+    """Base class for the local SQLite records kept by `export_tables`.
+    Subclasses list the statements creating their tables in `_schema`.
+
+    Parameters
+    ----------
+    path : str
+        Path to the SQLite database file. It is created if it does not exist.
+        Different kinds of records may share the same file.
+    """
+
+    _schema = []
+
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._connect() as conn:
+            for statement in self._schema:
+                conn.execute(statement)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # a fresh connection per operation keeps the store usable across threads
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+class ExportWatermarkStore(_SQLiteStore):
+    """A local SQLite record of which rows have already been exported from a
+    source table to a target table.
+
+    Rows are identified by the (serialized) values of their `reference_col`
+    column(s), so that `export_tables` can determine which source rows are
+    new without downloading the target table on every run.
+
+    Parameters
+    ----------
+    path : str
+        Path to the SQLite database file. It is created if it does not exist.
+    """
+
+    _schema = [
+        "CREATE TABLE IF NOT EXISTS checkpoints ("
+        "source TEXT NOT NULL, target TEXT NOT NULL, "
+        "reference_col TEXT NOT NULL, "
+        "PRIMARY KEY (source, target, reference_col))",
+        "CREATE TABLE IF NOT EXISTS exported_keys ("
+        "source TEXT NOT NULL, target TEXT NOT NULL, "
+        "reference_col TEXT NOT NULL, key TEXT NOT NULL, "
+        "PRIMARY KEY (source, target, reference_col, key))",
+    ]
+
+    @staticmethod
+    def _reference_col_str(reference_col):
+        if isinstance(reference_col, str):
+            return reference_col
+        return ",".join(reference_col)
+
+    def has_checkpoint(self, source, target, reference_col):
+        """Whether the exported keys of this source/target pair are known."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM checkpoints WHERE source = ? AND target = ? "
+                "AND reference_col = ?",
+                (source, target, self._reference_col_str(reference_col)),
+            ).fetchone()
+        return row is not None
+
+    def existing_keys(self, source, target, reference_col, keys):
+        """Return the subset of `keys` which have already been exported
+        from `source` to `target`."""
+        reference_col = self._reference_col_str(reference_col)
+        keys = list(set(keys))
+        found = set()
+        with self._connect() as conn:
+            for i in range(0, len(keys), SQLITE_BATCH_SIZE):
+                batch = keys[i : i + SQLITE_BATCH_SIZE]
+                rows = conn.execute(
+                    "SELECT key FROM exported_keys WHERE source = ? "
+                    "AND target = ? AND reference_col = ? AND key IN ({})".format(
+                        ",".join("?" * len(batch))
+                    ),
+                    [source, target, reference_col] + batch,
+                )
+                found.update(r[0] for r in rows)
+        return found
+
+    def add_keys(self, source, target, reference_col, keys):
+        """Record `keys` as exported from `source` to `target`."""
+        reference_col = self._reference_col_str(reference_col)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO checkpoints VALUES (?, ?, ?)",
+                (source, target, reference_col),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO exported_keys VALUES (?, ?, ?, ?)",
+                ((source, target, reference_col, k) for k in keys),
+            )
+        logger.debug(
+            "Recorded exported keys for source %s -> target %s", source, target
+        )
+
+    def replace_keys(self, source, target, reference_col, keys):
+        """Forget any keys recorded for this pair and record `keys` instead."""
+        self.reset(source, target)
+        self.add_keys(source, target, reference_col, keys)
+
+    def reset(self, source, target):
+        """Forget everything recorded for this source/target pair, for example
+        after the target table has been modified outside of `export_tables`."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "DELETE FROM checkpoints WHERE source = ? AND target = ?",
+                (source, target),
+            )
+            conn.execute(
+                "DELETE FROM exported_keys WHERE source = ? AND target = ?",
+                (source, target),
+            )
+        logger.debug("Reset watermark for source %s -> target %s", source, target)
+
+
+class FileHandleCopyCache(_SQLiteStore):
+    """A local SQLite record of file handles which have already been copied,
+    mapping each original file handle ID to the ID of its copy.
+
+    Copies are recorded under a scope, normally the Synapse ID of the
+    table (or project) the copies are exported to, so that each target
+    only reuses the copies made for it.
+
+    Parameters
+    ----------
+    path : str
+        Path to the SQLite database file. It is created if it does not exist.
+    """
+
+    _schema = [
+        "CREATE TABLE IF NOT EXISTS copied_file_handles ("
+        "scope TEXT NOT NULL, file_handle_id TEXT NOT NULL, "
+        "new_file_handle_id TEXT NOT NULL, "
+        "PRIMARY KEY (scope, file_handle_id))"
+    ]
+
+    def get(self, scope, file_handle_ids):
+        """Return a dict mapping those of `file_handle_ids` which have already
+        been copied within `scope` to the IDs of their copies."""
+        file_handle_ids = [str(i) for i in set(file_handle_ids)]
+        copies = {}
+        with self._connect() as conn:
+            for i in range(0, len(file_handle_ids), SQLITE_BATCH_SIZE):
+                batch = file_handle_ids[i : i + SQLITE_BATCH_SIZE]
+                rows = conn.execute(
+                    "SELECT file_handle_id, new_file_handle_id "
+                    "FROM copied_file_handles WHERE scope = ? "
+                    "AND file_handle_id IN ({})".format(",".join("?" * len(batch))),
+                    [scope] + batch,
+                )
+                copies.update(rows)
+        return copies
+
+    def add(self, scope, fhid_map):
+        """Record the copies in `fhid_map`, a dict mapping original file
+        handle IDs to the IDs of their copies."""
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO copied_file_handles VALUES (?, ?, ?)",
+                ((scope, str(k), str(v)) for k, v in fhid_map.items()),
+            )
+        logger.debug("Recorded %d file handle copies for %s", len(fhid_map), scope)
@@ -1,14 +1,56 @@
 import os
+import time
 import logging
+import functools
+import concurrent.futures
+import requests
 import synapsebridgehelpers
 import synapseclient as sc
 import numpy as np
+import pandas as pd
+from .export_state import ExportWatermarkStore, FileHandleCopyCache
+from .getFileIds import _RateLimiter
 
 logger = logging.getLogger(__name__)
 
+# rows deleted per request when clearing a target table in replace mode
+TRUNCATE_PAGE_SIZE = 10000
+
+
+class TableExportError(Exception):
+    """Raised by `export_tables` when exporting tables concurrently and
+    one or more of the tables could not be exported.
+
+    Attributes
+    ----------
+    results : dict
+        The results of the tables which were exported successfully, in the
+        same format as is returned by `export_tables`.
+    errors : dict
+        A mapping from the Synapse ID of each source table which failed to
+        be exported to the exception that was raised.
+    """
+
+    def __init__(self, results, errors):
+        self.results = results
+        self.errors = errors
+        super().__init__(
+            "Failed to export {} table(s): {}".format(len(errors), ", ".join(errors))
+        )
+
 
 def replace_file_handles(
-    syn, df, source_table_id, source_table_cols=None, content_type="application/json"
+    syn,
+    df,
+    source_table_id,
+    source_table_cols=None,
+    content_type="application/json",
+    file_handle_cache=None,
+    cache_scope=None,
+    max_concurrent_batches=1,
+    max_batches_per_second=None,
+    rate_limiter=None,
+    only_unowned=False,
 ):
     """Replace the file handles in columns of type 'FILEHANDLEID'
 
@@ -20,6 +62,24 @@ def replace_file_handles(
         Synapse ID of the table the original file handles belong to.
     source_table_cols : iterable of synapseclient.Column objects
     content_type : str
+    file_handle_cache : FileHandleCopyCache, default None
+        A record of file handles which have already been copied. Only file
+        handles which are not in the record are copied.
+    cache_scope : str, default None
+        The scope to look up and record copies under in `file_handle_cache`,
+        normally the Synapse ID of the table `df` will be stored to.
+    max_concurrent_batches : int, default 1
+        The number of batches of file handles to copy at the same time.
+    max_batches_per_second : float, default None
+        If set, start copying no more than this many batches per second,
+        across all columns.
+    rate_limiter : _RateLimiter, default None
+        A rate limiter shared with other calls, e.g. by every table of an
+        export. Takes precedence over `max_batches_per_second`.
+    only_unowned : bool, default False
+        Only copy (and replace) the file handles which were not created by
+        the current user. The current user's own file handles can be
+        stored to other tables as they are.
 
     Returns
     -------
@@ -29,27 +89,46 @@ def replace_file_handles(
     logger.info("Replacing file handles for source table %s", source_table_id)
     if source_table_cols is None:
         source_table_cols = syn.getTableColumns(source_table_id)
+    if rate_limiter is None:
+        rate_limiter = _RateLimiter(max_batches_per_second)
     for c in source_table_cols:
         if c["columnType"] == "FILEHANDLEID":
-            file_handle_count = int(df[c["name"]].notna().sum())
+            file_ids = df[c["name"]]
+            if only_unowned:
+                unowned_fhids = synapsebridgehelpers.findUnownedFileIds(
+                    syn, table_id=source_table_id, fileIds=file_ids
+                )
+                file_ids = pd.Series(unowned_fhids, dtype=object)
+            file_handle_count = int(file_ids.notna().sum())
             logger.debug(
                 "Copying %d file handles for column %s",
                 file_handle_count,
                 c["name"],
             )
+            if file_handle_count == 0:
+                continue
             fhid_map = synapsebridgehelpers.copyFileIdsInBatch(
                 syn,
                 table_id=source_table_id,
-                fileIds=df[c["name"]],
+                fileIds=file_ids,
                 content_type=content_type,
+                cache=file_handle_cache,
+                cache_scope=cache_scope,
+                max_concurrent_batches=max_concurrent_batches,
+                rate_limiter=rate_limiter,
             )
             fhid_map = {str(k): str(v) for k, v in fhid_map.items()}
-            df[c["name"]] = df[c["name"]].apply(parse_number_to_string).map(fhid_map)
+            file_handles = _numbers_to_strings(df[c["name"]])
+            new_file_handles = file_handles.map(fhid_map)
+            if only_unowned:
+                new_file_handles = new_file_handles.where(
+                    new_file_handles.notna(), file_handles
+                )
+            df[c["name"]] = new_file_handles
     return df
 
 
 def parse_number_to_string(i):
-    logger.debug("Parsing value to string-safe Synapse format")
     str_i = str(i)
     if str_i == "nan":
         str_i = None
@@ -58,6 +137,74 @@ def parse_number_to_string(i):
     return str_i
 
 
+def _numbers_to_strings(values):
+    """A vectorized equivalent of mapping `parse_number_to_string` over
+    a pandas Series.
+
+    Integer columns (including nullable integer columns) and whole-valued
+    float columns, which is what integer columns containing missing values
+    become when queried from Synapse, are converted as arrays of int64.
+    Any remaining values are passed to `parse_number_to_string`.
+
+    Returns
+    -------
+    A pandas Series of object dtype containing str or None, indexed
+    like `values`.
+    """
+    result = np.full(len(values), None, dtype=object)
+    if pd.api.types.is_bool_dtype(values.dtype):
+        other = np.ones(len(values), dtype=bool)
+    elif pd.api.types.is_integer_dtype(values.dtype):
+        whole = values.notna().to_numpy()
+        result[whole] = _ints_to_strings(values[whole].to_numpy(dtype=np.int64))
+        other = np.zeros(len(values), dtype=bool)
+    elif pd.api.types.is_float_dtype(values.dtype):
+        x = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        missing = np.isnan(x)
+        with np.errstate(invalid="ignore"):
+            # whole numbers which str() would not write in scientific
+            # notation and which are not negative zero
+            whole = (
+                ~missing
+                & (np.abs(x) < 1e16)
+                & (x == np.floor(x))
+                & ~((x == 0) & np.signbit(x))
+            )
+        result[whole] = _ints_to_strings(x[whole].astype(np.int64))
+        other = ~missing & ~whole
+    else:
+        other = np.ones(len(values), dtype=bool)
+    if other.any():
+        result[other] = np.fromiter(
+            map(parse_number_to_string, values[other]),
+            dtype=object,
+            count=int(other.sum()),
+        )
+    return pd.Series(result, index=values.index, dtype=object)
+
+
+def _ints_to_strings(ints):
+    """Convert a numpy array of int64 to an array of str objects."""
+    return np.fromiter(map(str, ints.tolist()), dtype=object, count=len(ints))
+
+
+def _reference_keys(df, reference_col):
+    """Serialize the `reference_col` value(s) of each row in `df` to a single
+    string, so that rows can be compared across tables and recorded in an
+    ExportWatermarkStore.
+
+    Returns
+    -------
+    A pandas Series of str, indexed like `df`.
+    """
+    if isinstance(reference_col, str):
+        reference_col = [reference_col]
+    keys = _numbers_to_strings(df[reference_col[0]]).fillna("")
+    for c in reference_col[1:]:
+        keys = keys + "\x1f" + _numbers_to_strings(df[c]).fillna("")
+    return keys
+
+
 def _sanitize_dataframe(syn, records, target=None, cols=None):
     """Format the values and dtypes of a pandas DataFrame so that it may be
     uploaded to Synapse as a Table.
@@ -90,12 +237,109 @@ def _sanitize_dataframe(syn, records, target=None, cols=None):
             and isinstance(records[c["name"]].iloc[0], np.number)
         ):
             logger.debug("Sanitizing column %s of type %s", c["name"], c["columnType"])
-            records[c["name"]] = list(map(parse_number_to_string, records[c["name"]]))
+            records[c["name"]] = _numbers_to_strings(records[c["name"]])
     return records
 
 
+def _is_transient_error(e):
+    """Whether a failed request is worth retrying."""
+    if isinstance(e, requests.exceptions.ConnectionError):
+        return True
+    response = getattr(e, "response", None)
+    if response is None:
+        return False
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def _store_with_retries(syn, obj, max_retries=3, stored=None, **kwargs):
+    """Call syn.store, retrying (with exponential backoff) up to `max_retries`
+    times if the request fails for a transient reason. Other errors, such as
+    those caused by unowned file handles, are raised immediately.
+
+    A transient error other than a 429 response does not mean that the
+    store failed, since Synapse may have applied it before the connection
+    failed or a 5XX response was returned. Such errors are only retried if
+    `stored` is set. It is called before each of those retries and if it
+    returns anything other than None the store is assumed to have succeeded
+    and that value is returned rather than storing `obj` a second time."""
+    for attempt in range(max_retries + 1):
+        try:
+            return syn.store(obj, **kwargs)
+        except (
+            sc.core.exceptions.SynapseHTTPError,
+            requests.exceptions.ConnectionError,
+        ) as e:
+            if attempt == max_retries or not _is_transient_error(e):
+                raise
+            rejected = getattr(e, "response", None) is not None and (
+                e.response.status_code == 429
+            )
+            if not rejected and stored is None:
+                raise
+            logger.warning(
+                "Transient error while storing (attempt %d of %d), retrying: %s",
+                attempt + 1,
+                max_retries + 1,
+                e,
+            )
+            time.sleep(2**attempt)
+            if not rejected:
+                result = stored()
+                if result is not None:
+                    logger.info("The failed store was applied, not retrying")
+                    return result
+
+
+def _stored_batch(syn, table, chunk, sanitized_chunk, df_cols, key_col):
+    """Check whether a batch of rows whose store failed was stored anyway,
+    by looking up the `key_col` values of `chunk` in the table.
+
+    Parameters
+    ----------
+    syn : synapseclient.Synapse
+    table : str or tuple
+        Synapse ID of the table, or (name, parent ID) of a table which
+        may have been created by the failed store.
+    chunk : pandas.DataFrame
+    sanitized_chunk : pandas.DataFrame
+        `chunk` as it was stored.
+    df_cols : list of synapseclient.Column objects
+    key_col : str or list
+
+    Returns
+    -------
+    A synapseclient.Table of `sanitized_chunk` if every row was stored,
+    or None if none of them were. An exception is raised if only some of
+    them were stored.
+    """
+    table_id = table if isinstance(table, str) else syn.findEntityId(*table)
+    if table_id is None:
+        return None
+    target_keys = _reference_keys(_query_target_keys(syn, table_id, key_col), key_col)
+    found = _reference_keys(chunk, key_col).isin(target_keys.values)
+    if found.all():
+        return sc.Table(table_id, sanitized_chunk, columns=df_cols)
+    if found.any():
+        raise RuntimeError(
+            "Only {} of the {} rows of a failed store were stored to {}.".format(
+                int(found.sum()), len(found), table_id
+            )
+        )
+    return None
+
+
 def _store_dataframe_to_table(
-    syn, df, df_cols, table_id=None, parent_id=None, table_name=None, **kwargs
+    syn,
+    df,
+    df_cols,
+    table_id=None,
+    parent_id=None,
+    table_name=None,
+    chunk_size=None,
+    max_retries=3,
+    key_col=None,
+    progress=None,
+    **kwargs
 ):
     """Store a pandas DataFrame to Synapse in a safe way by formatting the
     the values so that the store operation is not rejected by Synapse.
@@ -116,8 +360,30 @@ def _store_dataframe_to_table(
     table_name : str, default None
         Either `table_id` or both `parent_id` and `table_name` must
         be supplied as arguments.
+    chunk_size : int, default None
+        If set, store `df` in batches of at most this many rows, so that only
+        one batch at a time is sanitized and serialized. Batches which were
+        stored before a failed batch are not rolled back.
+    max_retries : int, default 3
+        How many times to retry storing a batch which failed because of a
+        transient error (a connection error or a 429 or 5XX response).
+        Only 429 responses are retried unless `key_col` is set.
+    key_col : str or list, default None
+        Column(s) of `df` identifying its rows. If set (and in `df`), the
+        values of these columns in the table are checked after a transient
+        error, and the batch is only stored again if none of its rows were
+        stored.
+    progress : dict, default None
+        If set, updated after each batch is stored with the number of rows
+        of `df` stored so far ("rows") and the Synapse ID of the table
+        ("table_id"), so that the caller can resume from the first batch
+        which was not stored if an exception is raised.
     **kwargs :
         Keyword arguments to provide to syn.store (useful for provenance)
+
+    Returns
+    -------
+    The synapseclient.Table returned when storing the last batch.
     """
     logger.info(
         "Storing dataframe to table (table_id=%s, parent_id=%s, table_name=%s)",
@@ -130,22 +396,128 @@ def _store_dataframe_to_table(
             "Either the table Synapse ID must be set or "
             "the parent ID and table name must be set."
         )
-    sanitized_dataframe = _sanitize_dataframe(syn, records=df, cols=df_cols)
-    if table_id is None:
-        target_table_schema = sc.Schema(
-            name=table_name, parent=parent_id, columns=df_cols
-        )
-        target_table = sc.Table(
-            schema=target_table_schema, values=sanitized_dataframe, columns=df_cols
+    if progress is None:
+        progress = {}
+    progress["rows"] = 0
+    progress["table_id"] = table_id
+    if chunk_size is None:
+        chunk_size = max(len(df), 1)
+    if key_col is not None:
+        key_cols = [key_col] if isinstance(key_col, str) else key_col
+        if not all(c in df for c in key_cols):
+            key_col = None
+    # an empty DataFrame is still stored once, to create the table if need be
+    for start in range(0, max(len(df), 1), chunk_size):
+        chunk = df.iloc[start : start + chunk_size]
+        if chunk_size < len(df):
+            logger.debug(
+                "Storing rows %d to %d of %d", start, start + len(chunk), len(df)
+            )
+        sanitized_dataframe = _sanitize_dataframe(syn, records=chunk, cols=df_cols)
+        if table_id is None:
+            target_table_schema = sc.Schema(
+                name=table_name, parent=parent_id, columns=df_cols
+            )
+            target_table = sc.Table(
+                schema=target_table_schema, values=sanitized_dataframe, columns=df_cols
+            )
+        else:
+            target_table = sc.Table(table_id, sanitized_dataframe, columns=df_cols)
+        stored = None
+        if key_col is not None:
+            stored = functools.partial(
+                _stored_batch,
+                syn,
+                table_id if table_id is not None else (table_name, parent_id),
+                chunk,
+                sanitized_dataframe,
+                df_cols,
+                key_col,
+            )
+        target_table = _store_with_retries(
+            syn, target_table, max_retries=max_retries, stored=stored, **kwargs
         )
-    else:
-        target_table = sc.Table(table_id, sanitized_dataframe, columns=df_cols)
-    target_table = syn.store(target_table, **kwargs)
+        table_id = target_table.tableId
+        progress["rows"] = start + len(chunk)
+        progress["table_id"] = table_id
     logger.info("Stored dataframe successfully")
     return target_table
 
 
-def dump_on_error(df, e, syn, source_table, target_table):
+def _truncate_table(syn, table_id, page_size=TRUNCATE_PAGE_SIZE):
+    """Delete every row of a Synapse table without downloading its values.
+
+    Only row IDs and versions are fetched, one page of at most `page_size`
+    rows at a time, and each page is deleted before the next is fetched.
+
+    Returns
+    -------
+    The number of rows deleted.
+    """
+    logger.info("Deleting existing rows of %s", table_id)
+    last_row_id = -1
+    deleted = 0
+    while True:
+        page = syn.tableQuery(
+            "select ROW_ID from {} where ROW_ID > {} "
+            "order by ROW_ID limit {}".format(table_id, last_row_id, int(page_size))
+        )
+        row_ids = [row.row_id for row in page.iter_row_metadata()]
+        if not row_ids:
+            break
+        syn.delete(page)
+        deleted += len(row_ids)
+        last_row_id = max(row_ids)
+        logger.debug("Deleted %d rows of %s", deleted, table_id)
+    return deleted
+
+
+def _query_target_keys(syn, target, reference_col):
+    """Fetch only the `reference_col` column(s) of a Synapse table."""
+    logger.debug("Fetching reference column(s) of target %s", target)
+    if isinstance(reference_col, str):
+        reference_col = [reference_col]
+    target_keys = syn.tableQuery(
+        "select {} from {}".format(", ".join(reference_col), target)
+    )
+    return target_keys.asDataFrame()
+
+
+def _rename_detection_sample(syn, source_table, target, reference_col, sample_size):
+    """Fetch at most `sample_size` rows of a Synapse table along with the
+    rows of `source_table` sharing the same `reference_col` values, in the
+    same order, so that they may be passed to `compare_schemas`.
+
+    Returns
+    -------
+    A tuple (source_sample, target_sample). Both are None if the target table
+    is empty.
+    """
+    logger.debug("Fetching a sample of %d rows from target %s", sample_size, target)
+    target_sample = syn.tableQuery(
+        "select * from {} limit {}".format(target, int(sample_size))
+    )
+    target_sample = target_sample.asDataFrame()
+    if len(target_sample) == 0 or len(source_table) == 0:
+        return None, None
+    ref_cols = [reference_col] if isinstance(reference_col, str) else reference_col
+    if all(c in source_table and c in target_sample for c in ref_cols):
+        source_keys = _reference_keys(source_table, reference_col)
+        unique_keys = ~source_keys.duplicated().values
+        source_sample = source_table[unique_keys]
+        source_sample.index = source_keys[unique_keys].values
+        target_keys = _reference_keys(target_sample, reference_col)
+        matched = target_keys.isin(source_sample.index).values
+        if matched.any():
+            source_sample = source_sample.loc[target_keys[matched].values]
+            return source_sample, target_sample[matched]
+    # no shared rows to compare, fall back to comparing rows by position
+    return source_table.iloc[: len(target_sample)], target_sample
+
+
+def dump_on_error(
+    df, e, syn, source_table, target_table, dump_name="target_table_dump.csv"
+):
     """Write `df` to the current directory, send an email to the current
     Synapse user, and raise an exception.
 
@@ -156,6 +528,7 @@ def dump_on_error(df, e, syn, source_table, target_table):
     syn : synapseclient.Synapse
     source_table : str
     target_table : str
+    dump_name : str, default "target_table_dump.csv"
 
     Returns
     -------
@@ -166,7 +539,6 @@ def dump_on_error(df, e, syn, source_table, target_table):
         source_table,
         target_table,
     )
-    dump_name = "target_table_dump.csv"
     df.to_csv(dump_name)
     this_user = syn.getUserProfile()
     syn.sendMessage(
@@ -182,10 +554,55 @@ def dump_on_error(df, e, syn, source_table, target_table):
     raise Exception(
         "There was a problem synchronizing the source and target schemas. "
         "The target table has been saved to {} in the current directory "
-        "as a precautionary measure".format("target_table_dump.csv")
+        "as a precautionary measure".format(dump_name)
     ) from e
 
 
+class _ColumnFingerprint:
+    """The values of a pandas Series along with a hash of each value, used to
+    quickly check whether two columns have equal values at enough positions
+    to be considered the same column.
+
+    Numbers (including booleans) are compared as float64, so that an INTEGER
+    column with missing values compares equal to the same column without
+    missing values. Missing values are never equal to anything. Columns
+    containing unhashable values, such as the lists of a STRING_LIST
+    column, are compared by the `str` of each value.
+    """
+
+    def __init__(self, values):
+        self.numeric = pd.api.types.is_numeric_dtype(values.dtype)
+        if self.numeric:
+            self.values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            self.present = ~np.isnan(self.values)
+        else:
+            self.present = values.notna().to_numpy()
+            self.values = np.array(values.to_numpy(dtype=object), dtype=object)
+            self.values[~self.present] = np.nan
+        try:
+            self.hashes = pd.util.hash_array(self.values)
+        except TypeError:
+            self.values[self.present] = [str(v) for v in self.values[self.present]]
+            self.hashes = pd.util.hash_array(self.values)
+
+    def matches(self, other, threshold):
+        """Whether `self` and `other` have equal values at a proportion of
+        at least `threshold` of their positions, up to the length of the
+        shorter column. Values are only compared at the positions where
+        their hashes are equal, and only if there are enough of those."""
+        n = min(len(self.values), len(other.values))
+        if n == 0:
+            return False
+        candidates = self.present[:n] & other.present[:n]
+        if self.numeric == other.numeric:  # otherwise the hashes are not comparable
+            candidates &= self.hashes[:n] == other.hashes[:n]
+        # equal values have equal hashes, so this is an upper bound on the overlap
+        if np.count_nonzero(candidates) / n < threshold:
+            return False
+        equal = self.values[:n][candidates] == other.values[:n][candidates]
+        return np.count_nonzero(equal) / n >= threshold
+
+
 def compare_schemas(
     source_cols, target_cols, source_table=None, target_table=None, rename_threshold=0.9
 ):
@@ -243,6 +660,9 @@ def compare_schemas(
         and len(added_cols)
         and len(removed_cols)
     ):
+        # each column is hashed at most once, however many pairs it is in
+        fingerprints = {}
+        target_fingerprints = {}
         for source_col in added_cols:
             for target_col in removed_cols:
                 if (
@@ -254,13 +674,17 @@ def compare_schemas(
                             "A column containing file handles "
                             "was potentially renamed."
                         )
-                    overlap = [
-                        i == j
-                        for i, j in zip(
-                            source_table[source_col], target_table[target_col]
+                    if source_col not in fingerprints:
+                        fingerprints[source_col] = _ColumnFingerprint(
+                            source_table[source_col]
                         )
-                    ]
-                    if sum(overlap) / len(overlap) >= rename_threshold:
+                    if target_col not in target_fingerprints:
+                        target_fingerprints[target_col] = _ColumnFingerprint(
+                            target_table[target_col]
+                        )
+                    if fingerprints[source_col].matches(
+                        target_fingerprints[target_col], rename_threshold
+                    ):
                         renamed_cols[target_col] = source_col
         for target_col, source_col in renamed_cols.items():
             removed_cols.discard(target_col)
@@ -356,6 +780,482 @@ def synchronize_schemas(
     return target_schema
 
 
+def _store_remaining_rows(
+    syn,
+    df,
+    df_cols,
+    progress,
+    source_table_id,
+    file_handle_cache=None,
+    cache_scope=None,
+    max_concurrent_batches=1,
+    rate_limiter=None,
+    **kwargs
+):
+    """Copy the file handles of the rows of `df` which were not stored by
+    a failed call to `_store_dataframe_to_table` and store those rows,
+    resuming from the first batch which was not stored so that no row is
+    stored twice.
+
+    Parameters
+    ----------
+    syn : synapseclient.Synapse
+    df : pandas.DataFrame
+        The records passed to the failed call.
+    df_cols : list of synapseclient.Column objects
+    progress : dict
+        The `progress` of the failed call. Its "rows" are updated to count
+        the rows of `df` stored by either call.
+    source_table_id : str
+        Synapse ID of the table the original file handles belong to.
+    file_handle_cache : FileHandleCopyCache, default None
+    cache_scope : str, default None
+    max_concurrent_batches : int, default 1
+    rate_limiter : _RateLimiter, default None
+    **kwargs :
+        Keyword arguments to provide to `_store_dataframe_to_table`. The
+        table the failed call stored to, if it created one, takes precedence
+        over any `table_id`.
+
+    Returns
+    -------
+    A tuple (synapseclient.Table returned when storing the last batch,
+    `df` with the file handles of the rows which were not stored replaced).
+    """
+    stored_rows = progress.get("rows", 0)
+    if progress.get("table_id") is not None:
+        kwargs["table_id"] = progress["table_id"]
+    if stored_rows:
+        logger.info("Resuming store after %d rows which were stored", stored_rows)
+    remaining = replace_file_handles(
+        syn,
+        df=df.iloc[stored_rows:].copy(),
+        source_table_id=source_table_id,
+        file_handle_cache=file_handle_cache,
+        max_concurrent_batches=max_concurrent_batches,
+        rate_limiter=rate_limiter,
+        cache_scope=cache_scope,
+        source_table_cols=df_cols,
+    )
+    remaining_progress = {}
+    try:
+        target_table = _store_dataframe_to_table(
+            syn, df=remaining, df_cols=df_cols, progress=remaining_progress, **kwargs
+        )
+    finally:
+        progress["rows"] = stored_rows + remaining_progress.get("rows", 0)
+    return target_table, pd.concat([df.iloc[:stored_rows], remaining])
+
+
+def _export_to_new_table(
+    syn,
+    source_id,
+    source_table,
+    target_project,
+    copy_file_handles,
+    reference_col=None,
+    chunk_size=None,
+    file_handle_cache=None,
+    max_concurrent_batches=1,
+    rate_limiter=None,
+):
+    """Export the records of a source table to a new table in `target_project`.
+    `reference_col` identifies the records if storing them must be retried.
+
+    Returns
+    -------
+    A tuple (Synapse ID of the new table, exported records).
+    """
+    logger.info("Exporting source table %s into project %s", source_id, target_project)
+    source_table_info = syn.get(source_id)
+    source_table_cols = list(syn.getTableColumns(source_id))
+    if copy_file_handles or copy_file_handles is None:
+        source_table = replace_file_handles(
+            syn,
+            df=source_table,
+            source_table_id=source_id,
+            file_handle_cache=file_handle_cache,
+            max_concurrent_batches=max_concurrent_batches,
+            rate_limiter=rate_limiter,
+            cache_scope=target_project,
+            source_table_cols=source_table_cols,
+            only_unowned=copy_file_handles is None,
+        )
+    progress = {}
+    try:
+        target_table = _store_dataframe_to_table(
+            syn,
+            df=source_table,
+            df_cols=source_table_cols,
+            parent_id=target_project,
+            table_name=source_table_info["name"],
+            used=source_id,
+            chunk_size=chunk_size,
+            key_col=reference_col,
+            progress=progress,
+        )
+    except sc.core.exceptions.SynapseHTTPError as e:  # we don't own the file handles
+        logger.warning(
+            "HTTP error while storing source table %s into %s; handling file handles",
+            source_id,
+            target_project,
+        )
+        if copy_file_handles:  # actually we do, something else is wrong
+            raise sc.core.exceptions.SynapseHTTPError(
+                "There was an issue storing records from {} "
+                "to {}.".format(source_id, target_project)
+            ) from e
+        elif copy_file_handles is False:  # user explicitly specified no copies
+            raise e
+        else:
+            target_table, source_table = _store_remaining_rows(
+                syn,
+                df=source_table,
+                df_cols=source_table_cols,
+                progress=progress,
+                source_table_id=source_id,
+                file_handle_cache=file_handle_cache,
+                max_concurrent_batches=max_concurrent_batches,
+                rate_limiter=rate_limiter,
+                cache_scope=target_project,
+                parent_id=target_project,
+                table_name=source_table_info["name"],
+                used=source_id,
+                chunk_size=chunk_size,
+                key_col=reference_col,
+            )
+    return (target_table.tableId, source_table)
+
+
+def _export_to_preexisting_table(
+    syn,
+    source,
+    target,
+    source_table,
+    update,
+    reference_col,
+    copy_file_handles,
+    watermark_store,
+    key_only_scan,
+    rename_sample_size,
+    chunk_size=None,
+    file_handle_cache=None,
+    max_concurrent_batches=1,
+    rate_limiter=None,
+    dump_name="target_table_dump.csv",
+):
+    """Export the records of a source table to a preexisting target table.
+    See `export_tables` for a description of the parameters.
+
+    Returns
+    -------
+    A tuple (`target`, exported records), or None if no records were exported.
+    """
+    logger.info("Processing source %s -> target %s", source, target)
+    if source_table.shape[0] == 0:
+        logger.info("Skipping source %s because it has no rows", source)
+        return None
+    source_cols = list(syn.getTableColumns(source))
+    target_cols = list(syn.getTableColumns(target))
+    use_watermark = (
+        update
+        and watermark_store is not None
+        and reference_col is not None
+        and watermark_store.has_checkpoint(source, target, reference_col)
+    )
+    if use_watermark:
+        # the target only needs to be downloaded if its schema changed
+        schema_comparison = compare_schemas(
+            source_cols=source_cols, target_cols=target_cols
+        )
+        use_watermark = sum(list(map(len, schema_comparison.values()))) == 0
+    target_table = None
+    target_keys = None
+    if use_watermark:
+        logger.info("Using watermark to find new records for target %s", target)
+    elif key_only_scan:
+        logger.info("Using key-only scan of target %s", target)
+        # has the schema changed?
+        schema_comparison = compare_schemas(
+            source_cols=source_cols, target_cols=target_cols
+        )
+        if len(schema_comparison["added"]) and len(schema_comparison["removed"]):
+            source_sample, target_sample = _rename_detection_sample(
+                syn,
+                source_table=source_table,
+                target=target,
+                reference_col=reference_col,
+                sample_size=rename_sample_size,
+            )
+            schema_comparison = compare_schemas(
+                source_cols=source_cols,
+                target_cols=target_cols,
+                source_table=source_sample,
+                target_table=target_sample,
+            )
+        if len(schema_comparison["renamed"]) or len(schema_comparison["modified"]):
+            target_table = syn.tableQuery("select * from {}".format(target))
+            target_table = target_table.asDataFrame()
+        elif update:
+            target_keys = _query_target_keys(syn, target, reference_col)
+    else:
+        target_table = syn.tableQuery("select * from {}".format(target))
+        target_table = target_table.asDataFrame()
+        # has the schema changed?
+        schema_comparison = compare_schemas(
+            source_cols=source_cols,
+            target_cols=target_cols,
+            source_table=source_table,
+            target_table=target_table,
+        )
+    try:  # error after updating schema -> data may be lost from target table
+        if sum(list(map(len, schema_comparison.values()))) > 0:
+            logger.info("Applying schema changes before data export")
+            synchronize_schemas(
+                syn,
+                schema_comparison=schema_comparison,
+                source=source,
+                target=target,
+                source_cols=source_cols,
+                target_cols=target_cols,
+            )
+            if target_table is not None:
+                # synchronize schema of pandas DataFrame with Synapse
+                for col in schema_comparison["removed"]:
+                    target_table = target_table.drop(col, axis=1)
+                target_table = target_table.rename(schema_comparison["renamed"], axis=1)
+                target_table = _sanitize_dataframe(syn, target_table, target)
+                target_table = target_table.reset_index(drop=True)
+                syn.store(sc.Table(target, target_table, columns=source_cols))
+    except Exception as e:
+        if target_table is None:  # target table values were not modified
+            raise
+        dump_on_error(target_table, e, syn, source, target, dump_name=dump_name)
+    if target_table is not None:
+        target_keys = target_table
+    if update:
+        logger.info("Update mode enabled for target %s", target)
+        if reference_col is None:
+            raise TypeError(
+                "If updating target tables with new records "
+                "from a source table, you must specify a "
+                "reference column as a basis for comparison."
+            )
+        source_table = source_table.set_index(reference_col, drop=False)
+        if target_keys is None:
+            source_keys = _reference_keys(source_table, reference_col)
+            exported_keys = watermark_store.existing_keys(
+                source, target, reference_col, source_keys
+            )
+            new_records = source_table[~source_keys.isin(exported_keys).values]
+        else:
+            target_keys = target_keys.set_index(reference_col, drop=False)
+            if watermark_store is not None:
+                watermark_store.replace_keys(
+                    source,
+                    target,
+                    reference_col,
+                    _reference_keys(target_keys, reference_col),
+                )
+            new_records = source_table.loc[
+                source_table.index.difference(target_keys.index)
+            ]
+        if len(new_records):
+            logger.info(
+                "Found %d new records to append to %s", len(new_records), target
+            )
+            source_table_cols = list(syn.getTableColumns(source))
+            if copy_file_handles or copy_file_handles is None:
+                new_records = replace_file_handles(
+                    syn,
+                    df=new_records,
+                    source_table_id=source,
+                    file_handle_cache=file_handle_cache,
+                    max_concurrent_batches=max_concurrent_batches,
+                    rate_limiter=rate_limiter,
+                    cache_scope=target,
+                    source_table_cols=source_table_cols,
+                    only_unowned=copy_file_handles is None,
+                )
+            progress = {}
+            try:  # record the stored rows, even if only some were stored
+                try:
+                    target_table = _store_dataframe_to_table(
+                        syn,
+                        df=new_records,
+                        df_cols=source_table_cols,
+                        table_id=target,
+                        used=source,
+                        chunk_size=chunk_size,
+                        key_col=reference_col,
+                        progress=progress,
+                    )
+                except (
+                    sc.core.exceptions.SynapseHTTPError
+                ) as e:  # we don't own the file handles
+                    logger.warning(
+                        "HTTP error while appending new records from %s to %s; handling file handles",
+                        source,
+                        target,
+                    )
+                    if copy_file_handles:  # actually we do, something else is wrong
+                        raise sc.core.exceptions.SynapseHTTPError(
+                            "There was an issue storing records from {} "
+                            "to {}.".format(source, target)
+                        ) from e
+                    elif copy_file_handles is False:  # user specified no copies
+                        raise e
+                    else:
+                        target_table, new_records = _store_remaining_rows(
+                            syn,
+                            df=new_records,
+                            df_cols=source_table_cols,
+                            progress=progress,
+                            source_table_id=source,
+                            file_handle_cache=file_handle_cache,
+                            max_concurrent_batches=max_concurrent_batches,
+                            rate_limiter=rate_limiter,
+                            cache_scope=target,
+                            table_id=target,
+                            used=source,
+                            chunk_size=chunk_size,
+                            key_col=reference_col,
+                        )
+            finally:
+                if watermark_store is not None:
+                    watermark_store.add_keys(
+                        source,
+                        target,
+                        reference_col,
+                        _reference_keys(
+                            new_records.iloc[: progress.get("rows", 0)], reference_col
+                        ),
+                    )
+            return (target, new_records)
+        else:
+            logger.info("No new records to append for source %s", source)
+            return None
+    else:  # delete existing rows, store upstream rows
+        logger.info("Replace mode enabled for target %s", target)
+        _truncate_table(syn, target)
+        source_cols = list(syn.getTableColumns(source))
+        table_to_store = source_table
+        if copy_file_handles or copy_file_handles is None:
+            table_to_store = replace_file_handles(
+                syn,
+                df=source_table,
+                source_table_id=source,
+                file_handle_cache=file_handle_cache,
+                max_concurrent_batches=max_concurrent_batches,
+                rate_limiter=rate_limiter,
+                cache_scope=target,
+                source_table_cols=source_cols,
+                only_unowned=copy_file_handles is None,
+            )
+        progress = {}
+        try:  # record the stored rows, even if only some were stored
+            try:
+                target_table = _store_dataframe_to_table(
+                    syn,
+                    df=table_to_store,
+                    df_cols=source_cols,
+                    table_id=target,
+                    used=source,
+                    chunk_size=chunk_size,
+                    key_col=reference_col,
+                    progress=progress,
+                )
+            except (
+                sc.core.exceptions.SynapseHTTPError
+            ) as e:  # we don't own the file handles
+                logger.warning(
+                    "HTTP error while replacing records from %s to %s; handling file handles",
+                    source,
+                    target,
+                )
+                if copy_file_handles:  # actually we do, something else is wrong
+                    raise sc.core.exceptions.SynapseHTTPError(
+                        "There was an issue storing records from {} "
+                        "to {}.".format(source, target)
+                    ) from e
+                elif copy_file_handles is False:  # user specified no copies
+                    raise e
+                else:
+                    target_table, table_to_store = _store_remaining_rows(
+                        syn,
+                        df=table_to_store,
+                        df_cols=source_cols,
+                        progress=progress,
+                        source_table_id=source,
+                        file_handle_cache=file_handle_cache,
+                        max_concurrent_batches=max_concurrent_batches,
+                        rate_limiter=rate_limiter,
+                        cache_scope=target,
+                        table_id=target,
+                        used=source,
+                        chunk_size=chunk_size,
+                        key_col=reference_col,
+                    )
+        finally:
+            if watermark_store is not None and reference_col is not None:
+                watermark_store.replace_keys(
+                    source,
+                    target,
+                    reference_col,
+                    _reference_keys(
+                        table_to_store.iloc[: progress.get("rows", 0)], reference_col
+                    ),
+                )
+        return (target, table_to_store)
+
+
+def _export_each(export, jobs, max_workers=None):
+    """Call `export` for each source table in `jobs`.
+
+    Parameters
+    ----------
+    export : function
+    jobs : dict
+        A mapping from source table Synapse IDs to the keyword arguments
+        to call `export` with.
+    max_workers : int, default None
+        If greater than 1, export up to this many tables concurrently. A failed
+        export does not interrupt the others, and once every export has
+        finished a TableExportError is raised if any of them failed.
+
+    Returns
+    -------
+    A dict mapping source table Synapse IDs to the (non-None) values
+    returned by `export`.
+    """
+    results = {}
+    if max_workers is None or max_workers <= 1:
+        for source, job in jobs.items():
+            result = export(**job)
+            if result is not None:
+                results[source] = result
+        return results
+    errors = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(export, **job): source for source, job in jobs.items()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            source = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.exception("Failed to export source table %s", source)
+                errors[source] = e
+                continue
+            if result is not None:
+                results[source] = result
+    results = {source: results[source] for source in jobs if source in results}
+    if errors:
+        raise TableExportError(results, errors) from next(iter(errors.values()))
+    return results
+
+
 def export_tables(
     syn,
     table_mapping,
@@ -364,6 +1264,14 @@ def export_tables(
     update=True,
     reference_col="recordId",
     copy_file_handles=None,
+    watermark_store=None,
+    key_only_scan=False,
+    rename_sample_size=1000,
+    max_workers=None,
+    chunk_size=None,
+    file_handle_cache=None,
+    max_concurrent_batches=1,
+    max_batches_per_second=None,
     **kwargs
 ):
     """Copy rows from one Synapse table to another. Or copy tables
@@ -396,17 +1304,66 @@ def export_tables(
         updated to match the values in the source table even if `update` is True.
     reference_col : str or list
         If `update` is True, use this column(s) as the table index to determine
-        which records are already present in the target table.
+        which records are already present in the target table. If the records
+        include this column(s), it is also used to check whether records
+        whose store failed with a connection error or a 5XX response were
+        stored anyway, before storing them again.
     copy_file_handles : bool, default None
         Whether to copy the file handles from the source table to the target
-        table. By default, we will attempt to copy the source table records
-        without copying any file handles (copy_file_handles = None) and, if
-        an error is thrown, we will then copy the file handles before attempting
-        to store the table again. If the user explicitly sets
+        table. By default (copy_file_handles = None), we will check which of
+        the file handles in the source records are not owned by the user and
+        copy only those file handles before storing the records. If an error
+        is still thrown, we will then copy all the file handles before
+        attempting to store the table again. If the user explicitly sets
         copy_file_handles = False, an exception will be raised if any of the file
         handles in the source table are not owned by the user. Setting
         copy_file_handles = True always creates copies of file handles, whether
         the user owns them or not.
+    watermark_store : ExportWatermarkStore or str, default None
+        A local record (or the path to one) of which `reference_col` values
+        have already been exported to each preexisting target table. When
+        set and `update` is True, the target table is only downloaded the
+        first time a source/target pair is exported or when the source and
+        target schemas differ. Otherwise new records are determined by
+        checking the source rows against this record. The record must be
+        reset (`ExportWatermarkStore.reset`) if a target table is modified
+        by other means.
+    key_only_scan : bool, default False
+        When exporting to preexisting tables, download only the
+        `reference_col` column(s) of the target table to determine which
+        records are new, rather than the entire target table. Potentially
+        renamed columns are detected using at most `rename_sample_size` rows
+        of the target table. The entire target table is only downloaded if
+        a column was renamed or modified, since those values must be
+        rewritten after the schema is synchronized.
+    rename_sample_size : int, default 1000
+        The number of target table rows to compare against the source table
+        when detecting renamed columns if `key_only_scan` is True.
+    max_workers : int, default None
+        The number of source tables to export concurrently. By default,
+        tables are exported one at a time and the first error is raised
+        immediately. If greater than 1, an error exporting one table does
+        not interrupt the export of the other tables, and a TableExportError
+        containing the successful results is raised after every table has
+        been processed.
+    chunk_size : int, default None
+        If set, store records to each target table in batches of at most this
+        many rows, retrying any batch which fails for a transient reason
+        (see `reference_col`).
+        This bounds the memory used when storing large tables. If a batch
+        is rejected because of unowned file handles, storing resumes from
+        that batch once its file handles are copied.
+    file_handle_cache : FileHandleCopyCache or str, default None
+        A local record (or the path to one) of the file handles which have
+        already been copied for each target table (or, when creating new
+        tables, for each target project). File handles which were copied
+        by a previous run are reused rather than copied again.
+    max_concurrent_batches : int, default 1
+        The number of batches of file handles to copy at the same time
+        for each table.
+    max_batches_per_second : float, default None
+        If set, start copying no more than this many batches of file
+        handles per second, across all of the exported tables.
     **kwargs
         Additional named arguments to pass to synapsebridgehelpers.query_across_tables
 
@@ -415,6 +1372,11 @@ def export_tables(
     """
     logger.info("Starting table export")
     results = {}
+    if isinstance(watermark_store, str):
+        watermark_store = ExportWatermarkStore(watermark_store)
+    if isinstance(file_handle_cache, str):
+        file_handle_cache = FileHandleCopyCache(file_handle_cache)
+    rate_limiter = _RateLimiter(max_batches_per_second)  # shared by every table
     if isinstance(table_mapping, (list, str)):  # export to brand new tables
         logger.info("Export mode: create new table(s)")
         if target_project is None:
@@ -429,59 +1391,25 @@ def export_tables(
                 source_tables = {table_mapping: new_records[0]}
             else:
                 source_tables = {t: df for t, df in zip(table_mapping, new_records)}
-        for source_id, source_table in source_tables.items():
-            logger.info(
-                "Exporting source table %s into project %s", source_id, target_project
-            )
-            source_table_info = syn.get(source_id)
-            source_table_cols = list(syn.getTableColumns(source_id))
-            if copy_file_handles:
-                source_table = replace_file_handles(
-                    syn,
-                    df=source_table,
-                    source_table_id=source_id,
-                    source_table_cols=source_table_cols,
+        results = _export_each(
+            _export_to_new_table,
+            jobs={
+                source_id: dict(
+                    syn=syn,
+                    source_id=source_id,
+                    source_table=source_table,
+                    target_project=target_project,
+                    copy_file_handles=copy_file_handles,
+                    reference_col=reference_col,
+                    chunk_size=chunk_size,
+                    file_handle_cache=file_handle_cache,
+                    max_concurrent_batches=max_concurrent_batches,
+                    rate_limiter=rate_limiter,
                 )
-            try:
-                target_table = _store_dataframe_to_table(
-                    syn,
-                    df=source_table,
-                    df_cols=source_table_cols,
-                    parent_id=target_project,
-                    table_name=source_table_info["name"],
-                    used=source_id,
-                )
-            except (
-                sc.core.exceptions.SynapseHTTPError
-            ) as e:  # we don't own the file handles
-                logger.warning(
-                    "HTTP error while storing source table %s into %s; handling file handles",
-                    source_id,
-                    target_project,
-                )
-                if copy_file_handles:  # actually we do, something else is wrong
-                    raise sc.core.exceptions.SynapseHTTPError(
-                        "There was an issue storing records from {} "
-                        "to {}.".format(source_id, target_project)
-                    ) from e
-                elif copy_file_handles is False:  # user explicitly specified no copies
-                    raise e
-                else:
-                    source_table = replace_file_handles(
-                        syn,
-                        df=source_table,
-                        source_table_id=source_id,
-                        source_table_cols=source_table_cols,
-                    )
-                    target_table = _store_dataframe_to_table(
-                        syn,
-                        df=source_table,
-                        df_cols=source_table_cols,
-                        parent_id=target_project,
-                        table_name=source_table_info["name"],
-                        used=source_id,
-                    )
-            results[source_id] = (target_table.tableId, source_table)
+                for source_id, source_table in source_tables.items()
+            },
+            max_workers=max_workers,
+        )
     elif isinstance(table_mapping, dict):  # export to preexisting tables
         logger.info("Export mode: sync/update preexisting tables")
         tables = list(table_mapping)
@@ -490,163 +1418,35 @@ def export_tables(
                 syn, tables, **kwargs
             )
             source_tables = {t: df for t, df in zip(tables, new_records)}
-        for source, target in table_mapping.items():
-            logger.info("Processing source %s -> target %s", source, target)
-            source_table = source_tables[source]
-            if source_table.shape[0] == 0:
-                logger.info("Skipping source %s because it has no rows", source)
-                continue
-            target_table = syn.tableQuery("select * from {}".format(target))
-            target_table = target_table.asDataFrame()
-            # has the schema changed?
-            source_cols = list(syn.getTableColumns(source))
-            target_cols = list(syn.getTableColumns(target))
-            schema_comparison = compare_schemas(
-                source_cols=source_cols,
-                target_cols=target_cols,
-                source_table=source_table,
-                target_table=target_table,
-            )
-            try:  # error after updating schema -> data may be lost from target table
-                if sum(list(map(len, schema_comparison.values()))) > 0:
-                    logger.info("Applying schema changes before data export")
-                    synchronize_schemas(
-                        syn,
-                        schema_comparison=schema_comparison,
-                        source=source,
-                        target=target,
-                        source_cols=source_cols,
-                        target_cols=target_cols,
-                    )
-                    # synchronize schema of pandas DataFrame with Synapse
-                    for col in schema_comparison["removed"]:
-                        target_table = target_table.drop(col, axis=1)
-                    target_table = target_table.rename(
-                        schema_comparison["renamed"], axis=1
-                    )
-                    target_table = _sanitize_dataframe(syn, target_table, target)
-                    target_table = target_table.reset_index(drop=True)
-                    syn.store(sc.Table(target, target_table, columns=source_cols))
-            except Exception as e:
-                dump_on_error(target_table, e, syn, source, target)
-            if update:
-                logger.info("Update mode enabled for target %s", target)
-                if reference_col is not None:
-                    source_table = source_table.set_index(reference_col, drop=False)
-                    target_table = target_table.set_index(reference_col, drop=False)
-                else:
-                    raise TypeError(
-                        "If updating target tables with new records "
-                        "from a source table, you must specify a "
-                        "reference column as a basis for comparison."
-                    )
-                new_records = source_table.loc[
-                    source_table.index.difference(target_table.index)
-                ]
-                if len(new_records):
-                    logger.info(
-                        "Found %d new records to append to %s", len(new_records), target
-                    )
-                    source_table_info = syn.get(source)
-                    source_table_cols = list(syn.getTableColumns(source))
-                    if copy_file_handles:
-                        new_records = replace_file_handles(
-                            syn,
-                            df=new_records,
-                            source_table_id=source,
-                            source_table_cols=source_table_cols,
-                        )
-                    try:
-                        target_table = _store_dataframe_to_table(
-                            syn,
-                            df=new_records,
-                            df_cols=source_table_cols,
-                            table_id=target,
-                            used=source,
-                        )
-                    except (
-                        sc.core.exceptions.SynapseHTTPError
-                    ) as e:  # we don't own the file handles
-                        logger.warning(
-                            "HTTP error while appending new records from %s to %s; handling file handles",
-                            source,
-                            target,
-                        )
-                        if copy_file_handles:  # actually we do, something else is wrong
-                            raise sc.core.exceptions.SynapseHTTPError(
-                                "There was an issue storing records from {} "
-                                "to {}.".format(source, target)
-                            ) from e
-                        elif copy_file_handles is False:  # user specified no copies
-                            raise e
-                        else:
-                            source_table = replace_file_handles(
-                                syn,
-                                df=new_records,
-                                source_table_id=source,
-                                source_table_cols=source_table_cols,
-                            )
-                            target_table = _store_dataframe_to_table(
-                                syn,
-                                df=new_records,
-                                df_cols=source_table_cols,
-                                table_id=target,
-                                used=source,
-                            )
-                    results[source] = (target, new_records)
-                else:
-                    logger.info("No new records to append for source %s", source)
-            else:  # delete existing rows, store upstream rows
-                logger.info("Replace mode enabled for target %s", target)
-                target_table = syn.tableQuery("select * from {}".format(target))
-                syn.delete(target_table.asRowSet())
-                source_cols = list(syn.getTableColumns(source))
-                table_to_store = source_table
-                if copy_file_handles:
-                    table_to_store = replace_file_handles(
-                        syn,
-                        df=source_table,
-                        source_table_id=source,
-                        source_table_cols=source_cols,
-                    )
-                try:
-                    target_table = _store_dataframe_to_table(
-                        syn,
-                        df=table_to_store,
-                        df_cols=source_cols,
-                        table_id=target,
-                        used=source,
-                    )
-                except (
-                    sc.core.exceptions.SynapseHTTPError
-                ) as e:  # we don't own the file handles
-                    logger.warning(
-                        "HTTP error while replacing records from %s to %s; handling file handles",
-                        source,
-                        target,
-                    )
-                    if copy_file_handles:  # actually we do, something else is wrong
-                        raise sc.core.exceptions.SynapseHTTPError(
-                            "There was an issue storing records from {} "
-                            "to {}.".format(source, target)
-                        ) from e
-                    elif copy_file_handles is False:  # user specified no copies
-                        raise e
-                    else:
-                        table_to_store = replace_file_handles(
-                            syn,
-                            df=table_to_store,
-                            source_table_id=source,
-                            source_table_cols=source_cols,
-                        )
-                        target_table = _store_dataframe_to_table(
-                            syn,
-                            df=table_to_store,
-                            df_cols=source_cols,
-                            table_id=target,
-                            used=source,
-                        )
-                results[source] = (target, table_to_store)
+        results = _export_each(
+            _export_to_preexisting_table,
+            jobs={
+                source: dict(
+                    syn=syn,
+                    source=source,
+                    target=target,
+                    source_table=source_tables[source],
+                    update=update,
+                    reference_col=reference_col,
+                    copy_file_handles=copy_file_handles,
+                    watermark_store=watermark_store,
+                    key_only_scan=key_only_scan,
+                    rename_sample_size=rename_sample_size,
+                    chunk_size=chunk_size,
+                    file_handle_cache=file_handle_cache,
+                    max_concurrent_batches=max_concurrent_batches,
+                    rate_limiter=rate_limiter,
+                    # concurrent exports must not overwrite each other's dumps
+                    dump_name=(
+                        "target_table_dump.csv"
+                        if max_workers is None or max_workers <= 1
+                        else "target_table_dump_{}.csv".format(target)
+                    ),
+                )
+                for source, target in table_mapping.items()
+            },
+            max_workers=max_workers,
+        )
     else:
         raise TypeError(
             "table_mapping must be either a list (if exporting "
@@ -1,6 +1,6 @@
 import synapsebridgehelpers
        
-def filterTablesByActivity(syn, tables, healthCodes = None):
+def filterTablesByActivity(syn, tables, healthCodes = None, cache = None, membership = None):
     """ Given a dataframe containing columns table.id and simpleName
     this function groups all tables according to their simpleNames while 
     filtering the tables that contain the given healthCodes. When no healthCodes 
@@ -8,12 +8,16 @@ def filterTablesByActivity(syn, tables, healthCodes = None):
     
     Arguments:
     - tables: a dataframe of tables containing the columns table.id and simpleName
-    - healthCodes: list of healthCodes to filter the tables by"""
+    - healthCodes: list of healthCodes to filter the tables by
+    - cache: a QueryResultCache to read the healthCodes of each table from
+    - membership: a HealthCodeMembership to find the tables with data of the
+    healthCodes with, rather than querying every table for every new list"""
         
     if healthCodes == None:
         table_activities = dict(tables.groupby(by='simpleName')['table.id'].apply(list))
     else:
-        res = synapsebridgehelpers.find_tables_with_data(syn=syn, healthCodes=healthCodes, tables=tables)
+        res = synapsebridgehelpers.find_tables_with_data(syn=syn, healthCodes=healthCodes, tables=tables,
+                                                         cache=cache, membership=membership)
         res = res[res['healthCodeCounts']>0]
         table_activities = dict(res.groupby(by='simpleName')['table.id'].apply(list))
     return table_activities
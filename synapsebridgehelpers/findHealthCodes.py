@@ -1,7 +1,8 @@
 import pandas as pd
 from synapseclient.core.exceptions import SynapseHTTPError
 
-def externalIds2healthCodes(syn,tables, continueOnMissingColumn=True):
+def externalIds2healthCodes(syn,tables, continueOnMissingColumn=True, cache=None,
+                            index=None):
     """Given a list of tables determines
     the healthCodes that map to externalIds.
 
@@ -11,12 +12,21 @@ def externalIds2healthCodes(syn,tables, continueOnMissingColumn=True):
     Arguments:
     - `syn`: a Synapse client object
     - `tables`: list of table Ids
+    - `cache`: a QueryResultCache to read the results of unchanged tables from
+    - `index`: an IdentityIndex to update from the tables which have changed
+    since it was last updated, and to read the mapping from
     """
+    if index is not None:
+        index.refresh(syn, tables, continueOnMissingColumn)
+        return index.mapping(tables)
     QUERY = 'SELECT distinct externalId, healthCode FROM %s'
     dfs = []
     for table in tables:
         try:
-            idMap = syn.tableQuery(QUERY %table).asDataFrame()
+            if cache is not None:
+                idMap = cache.query(syn, QUERY %table)
+            else:
+                idMap = syn.tableQuery(QUERY %table).asDataFrame()
         except SynapseHTTPError as err:
             if err.response.status_code == 400 and continueOnMissingColumn:
                 pass
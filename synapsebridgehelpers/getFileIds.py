@@ -1,6 +1,52 @@
+import json
+import time
+import functools
+import threading
+import concurrent.futures
 import synapseutils as su
+from .compact import compact_dataframe
 
-def copyFileIdsInBatch(syn, table_id, fileIds, content_type = "application/json"):
+
+class _RateLimiter:
+    """Space out calls to `wait` so that at most `rate` calls
+    return per second, across all threads."""
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next_call = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            call_at = max(now, self._next_call)
+            self._next_call = call_at + self.interval
+        time.sleep(call_at - now)
+
+
+def _copy_file_handle_batch(syn, table_id, fhids, content_type, cache, cache_scope,
+                            rate_limiter):
+    """Copy a batch of (at most 100) file handles and return the new
+    file handles, in the same order as `fhids`."""
+    rate_limiter.wait()
+    new_fhids = su.copyFileHandles(
+            syn = syn,
+            fileHandles = fhids,
+            associateObjectTypes = ["TableEntity"] * len(fhids),
+            associateObjectIds = [table_id] * len(fhids),
+            newContentTypes = [content_type] * len(fhids),
+            newFileNames = [None] * len(fhids))
+    new_fhids = [int(i['newFileHandle']['id']) for i in new_fhids]
+    if cache is not None: # record each batch so an interrupted copy can resume
+        cache.add(cache_scope, dict(zip(fhids, new_fhids)))
+    return new_fhids
+
+
+def copyFileIdsInBatch(syn, table_id, fileIds, content_type = "application/json",
+                       cache = None, cache_scope = None, max_concurrent_batches = 1,
+                       max_batches_per_second = None, rate_limiter = None):
     """Copy file handles from a pandas.Series object.
 
     Parameters
@@ -11,34 +57,106 @@ def copyFileIdsInBatch(syn, table_id, fileIds, content_type = "application/json"
     fileIds : pandas.Series
         The column containing file handles
     content_type : str
+    cache : synapsebridgehelpers.FileHandleCopyCache, default None
+        A record of file handles which have already been copied. File
+        handles found in the cache are not copied again and new copies
+        are added to the cache.
+    cache_scope : str, default None
+        The scope to look up and record copies under in `cache`, normally
+        the Synapse ID of the table the copies will be stored to.
+        Defaults to `table_id`.
+    max_concurrent_batches : int, default 1
+        File handles are copied in batches of 100. This is the number of
+        batches which may be in flight at the same time.
+    max_batches_per_second : float, default None
+        If set, start no more than this many batches per second.
+    rate_limiter : _RateLimiter, default None
+        A rate limiter shared with other calls, so that their batches
+        together start no more than the limiter's rate per second. Takes
+        precedence over `max_batches_per_second`.
 
     Returns
     -------
-    A dict mapping original file handles to newly created file handles.
+    A dict mapping original file handles to newly created file handles,
+    ordered by the first appearance of each original file handle in
+    `fileIds`.
     """
     fhids_to_copy = fileIds.dropna().drop_duplicates().astype(int).tolist()
-    new_fhids = []
-    for i in range(0, len(fhids_to_copy), 100):
-        fhids_to_copy_i = fhids_to_copy[i:i+100]
-        new_fhids_i = su.copyFileHandles(
-                syn = syn,
-                fileHandles = fhids_to_copy_i,
-                associateObjectTypes = ["TableEntity"] * len(fhids_to_copy_i),
-                associateObjectIds = [table_id] * len(fhids_to_copy_i),
-                newContentTypes = [content_type] * len(fhids_to_copy_i),
-                newFileNames = [None] * len(fhids_to_copy_i))
-        for j in [int(i['newFileHandle']['id']) for i in new_fhids_i]:
-            new_fhids.append(j)
-    fhid_map = {k: v for k, v in zip(fhids_to_copy, new_fhids)}
+    if cache_scope is None:
+        cache_scope = table_id
+    cached_fhids = {}
+    if cache is not None:
+        cached_fhids = {int(k): int(v) for k, v in
+                        cache.get(cache_scope, fhids_to_copy).items()}
+    uncopied_fhids = [i for i in fhids_to_copy if i not in cached_fhids]
+    batches = [uncopied_fhids[i:i+100] for i in range(0, len(uncopied_fhids), 100)]
+    if rate_limiter is None:
+        rate_limiter = _RateLimiter(max_batches_per_second)
+    copy_batch = functools.partial(
+            _copy_file_handle_batch, syn, table_id, content_type = content_type,
+            cache = cache, cache_scope = cache_scope, rate_limiter = rate_limiter)
+    if max_concurrent_batches > 1 and len(batches) > 1:
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers = max_concurrent_batches) as executor:
+            # map returns the results in the same order as `batches`
+            new_fhid_batches = list(executor.map(copy_batch, batches))
+    else:
+        new_fhid_batches = list(map(copy_batch, batches))
+    new_fhids = [j for new_fhids_i in new_fhid_batches for j in new_fhids_i]
+    new_fhid_map = {k: v for k, v in zip(uncopied_fhids, new_fhids)}
+    fhid_map = {k: cached_fhids[k] if k in cached_fhids else new_fhid_map[k]
+                for k in fhids_to_copy}
     return fhid_map
 
 
-def tableWithFileIds(syn,table_id, healthcodes=None):
+def findUnownedFileIds(syn, table_id, fileIds):
+    """Find the file handles in a pandas.Series object which were not created
+    by the current Synapse user. Synapse only allows a user to store file
+    handles they created, so these are the file handles which must be copied
+    before the values of `fileIds` can be stored to another table.
+
+    Parameters
+    ----------
+    syn : synapseclient.Synapse
+    table_id : str
+        Synapse ID of the table the file handles belong to.
+    fileIds : pandas.Series
+        The column containing file handles
+
+    Returns
+    -------
+    A list of the file handles (int) which are not owned by the current user.
+    """
+    fhids = fileIds.dropna().drop_duplicates().astype(int).tolist()
+    owner_id = str(syn.getUserProfile()["ownerId"])
+    owned_fhids = set()
+    for i in range(0, len(fhids), 100):
+        fhids_i = fhids[i:i+100]
+        body = {
+            "requestedFiles": [
+                {"fileHandleId": str(fhid),
+                 "associateObjectId": table_id,
+                 "associateObjectType": "TableEntity"} for fhid in fhids_i],
+            "includeFileHandles": True,
+            "includePreSignedURLs": False,
+            "includePreviewPreSignedURLs": False}
+        results = syn.restPOST("/fileHandle/batch", body = json.dumps(body),
+                               endpoint = syn.fileHandleEndpoint)
+        for result in results["requestedFiles"]:
+            file_handle = result.get("fileHandle")
+            if (file_handle is not None and
+                    str(file_handle.get("createdBy")) == owner_id):
+                owned_fhids.add(int(result["fileHandleId"]))
+    return [fhid for fhid in fhids if fhid not in owned_fhids]
+
+
+def tableWithFileIds(syn,table_id, healthcodes=None, compact=False):
     """ Returns a dict like {'df': dataFrame, 'cols': names of columns of type FILEHANDLEID} with actual fileHandleIds,
-    also has an option to filter table given a list of healthcodes """
+    also has an option to filter table given a list of healthcodes, and to reduce the memory used by
+    the dataFrame with compact_dataframe """
 
     # Getting cols from current table id
-    cols = syn.getTableColumns(table_id) # Generator object
+    cols = list(syn.getTableColumns(table_id))
 
     # Finding column names in the current table that have FILEHANDLEIDs as their type
     cols_filehandleids = [col.name for col in cols if col.columnType == 'FILEHANDLEID']
@@ -58,4 +176,7 @@ def tableWithFileIds(syn,table_id, healthcodes=None):
         df[element] = df[element].map(copyFileIdsInBatch(syn,table_id,df[element]))
         df[element] = [int(x) if x==x else '' for x in df[element]]
 
+    if compact:
+        df = compact_dataframe(df, column_types = {col.name: col.columnType for col in cols})
+
     return {'df' : df, 'cols' : cols_filehandleids}
@@ -0,0 +1,167 @@
+import re
+import numbers
+import numpy as np
+import pandas as pd
+
+# characters with a special meaning in a LIKE pattern
+_LIKE_WILDCARDS = ("%", "_")
+
+
+def _quote(value):
+    """Format a value as a Synapse SQL literal."""
+    if isinstance(value, (bool, np.bool_)):
+        raise TypeError("Cannot compare identifiers to a boolean: {!r}".format(value))
+    # numpy scalars are converted first, since repr(np.int64(5)) is "np.int64(5)"
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    if isinstance(value, numbers.Real):
+        if not np.isfinite(value):  # repr would give inf or nan, which aren't SQL
+            raise ValueError("Cannot compare identifiers to {!r}".format(value))
+        return repr(float(value))
+    return "'{}'".format(str(value).replace("'", "''"))
+
+
+class IdentifierFilter:
+    """Base class of the filters which may be passed as the `identifier`
+    argument of `query_across_tables`.
+
+    A filter is a function of a single identifier value, like any
+    other callable `identifier`, but it can also be translated into a
+    Synapse SQL condition, so that only the matching rows are downloaded.
+    Where the condition can only narrow the rows down rather than match
+    them exactly (for example, because the value contains a LIKE wildcard),
+    the rows it matches are also filtered by calling the filter.
+    """
+
+    def sql(self, column):
+        """Return a Synapse SQL condition selecting (at least) the rows whose
+        `column` value passes the filter, or None if there is none."""
+        return None
+
+    @property
+    def exact(self):
+        """Whether the rows selected by `sql` are exactly those which pass
+        the filter, so that they don't need to be filtered again."""
+        return False
+
+    def match(self, value):
+        raise NotImplementedError
+
+    def __call__(self, value):
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return False
+        return self.match(value)
+
+
+class _LikeFilter(IdentifierFilter):
+    _pattern = "{}"
+
+    def __init__(self, value):
+        self.value = str(value)
+
+    def sql(self, column):
+        return "{} LIKE {}".format(column, _quote(self._pattern.format(self.value)))
+
+    @property
+    def exact(self):
+        # a wildcard in the value matches more than the literal character
+        return not any(c in self.value for c in _LIKE_WILDCARDS)
+
+
+class Prefix(_LikeFilter):
+    """Matches identifiers starting with `value`."""
+
+    _pattern = "{}%"
+
+    def match(self, value):
+        return str(value).startswith(self.value)
+
+
+class Suffix(_LikeFilter):
+    """Matches identifiers ending with `value`."""
+
+    _pattern = "%{}"
+
+    def match(self, value):
+        return str(value).endswith(self.value)
+
+
+class Contains(_LikeFilter):
+    """Matches identifiers containing `value`."""
+
+    _pattern = "%{}%"
+
+    def match(self, value):
+        return self.value in str(value)
+
+
+class Range(IdentifierFilter):
+    """Matches identifiers `low` <= identifier < `high` (or <= `high`, if
+    `inclusive` is True). Either bound may be None. Strings are compared
+    lexicographically, as Synapse compares them."""
+
+    def __init__(self, low=None, high=None, inclusive=False):
+        if low is None and high is None:
+            raise TypeError("At least one of `low` and `high` must be set.")
+        self.low = low
+        self.high = high
+        self.inclusive = inclusive
+
+    def sql(self, column):
+        conditions = []
+        if self.low is not None:
+            conditions.append("{} >= {}".format(column, _quote(self.low)))
+        if self.high is not None:
+            conditions.append(
+                "{} {} {}".format(
+                    column, "<=" if self.inclusive else "<", _quote(self.high)
+                )
+            )
+        return "({})".format(" AND ".join(conditions))
+
+    @property
+    def exact(self):
+        return True
+
+    def match(self, value):
+        if self.low is not None and value < self.low:
+            return False
+        if self.high is not None:
+            return value <= self.high if self.inclusive else value < self.high
+        return True
+
+
+class Regex(IdentifierFilter):
+    """Matches identifiers matching the regular expression `pattern`
+    (with `re.search`). Only a literal prefix anchored by "^" is
+    translated into SQL. The remainder of the pattern is matched after
+    the rows are downloaded."""
+
+    def __init__(self, pattern):
+        self.pattern = re.compile(pattern)
+
+    def literal_prefix(self):
+        """Return the literal characters every match of the pattern starts
+        with, or "" if the pattern isn't anchored by "^" (or matches
+        alternatives, or ignores case)."""
+        pattern = self.pattern.pattern
+        if (
+            not pattern.startswith("^")
+            or "|" in pattern
+            or self.pattern.flags & re.IGNORECASE
+        ):
+            return ""
+        prefix = re.match(r"[\w\- ]*", pattern[1:]).group(0)
+        # a quantifier applies to the last character of the prefix
+        if len(prefix) < len(pattern) - 1 and pattern[len(prefix) + 1] in "*?{":
+            prefix = prefix[:-1]
+        return prefix
+
+    def sql(self, column):
+        prefix = self.literal_prefix()
+        if not prefix:
+            return None
+        return Prefix(prefix).sql(column)
+
+    def match(self, value):
+        return self.pattern.search(str(value)) is not None
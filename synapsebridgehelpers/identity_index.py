@@ -0,0 +1,285 @@
+import array
+import bisect
+import logging
+import pandas as pd
+from synapseclient.core.exceptions import SynapseHTTPError
+from .export_state import _SQLiteStore, SQLITE_BATCH_SIZE
+from .query_cache import _table_version
+from .identifier_filters import Prefix, Suffix, Contains, Regex
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_QUERY = "SELECT distinct externalId, healthCode FROM %s"
+# substrings of up to this many characters are indexed by ExternalIdIndex
+NGRAM_SIZE = 3
+
+
+class IdentityIndex(_SQLiteStore):
+    """A local SQLite index of which healthCodes map to which externalIds
+    in Synapse tables, as returned by `externalIds2healthCodes`.
+
+    The pairs found in each table are stored with the version of the table
+    they were read from (see `QueryResultCache.table_version`). `refresh`
+    queries only the tables which have changed since, in parallel, so the
+    index persists across runs and is kept up to date incrementally.
+    Both columns are indexed, so looking up the healthCodes of an
+    externalId, or the externalIds of a healthCode, doesn't scan the index.
+
+    Parameters
+    ----------
+    path : str
+        Path to the SQLite database file. It is created if it does not exist.
+    """
+
+    _schema = [
+        "CREATE TABLE IF NOT EXISTS indexed_tables ("
+        "table_id TEXT PRIMARY KEY, version TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS identities ("
+        "table_id TEXT NOT NULL, external_id TEXT NOT NULL, "
+        "health_code TEXT NOT NULL, "
+        "PRIMARY KEY (table_id, external_id, health_code))",
+        "CREATE INDEX IF NOT EXISTS identities_by_external_id "
+        "ON identities (external_id)",
+        "CREATE INDEX IF NOT EXISTS identities_by_health_code "
+        "ON identities (health_code)",
+    ]
+
+    def version(self, table_id):
+        """Return the version of the table the index was last updated from,
+        or None if it hasn't been."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT version FROM indexed_tables WHERE table_id = ?", (table_id,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def update(self, table_id, version, df):
+        """Replace the pairs indexed for `table_id` with the externalId and
+        healthCode pairs in `df`, read from `version` of the table."""
+        df = df[["externalId", "healthCode"]].dropna().drop_duplicates()
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM identities WHERE table_id = ?", (table_id,))
+            conn.executemany(
+                "INSERT INTO identities VALUES (?, ?, ?)",
+                (
+                    (table_id, str(external_id), str(health_code))
+                    for external_id, health_code in df.itertuples(index=False)
+                ),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO indexed_tables VALUES (?, ?)",
+                (table_id, version),
+            )
+        logger.debug("Indexed %d identities of %s", len(df), table_id)
+
+    def refresh(self, syn, tables, continueOnMissingColumn=True, executor=None):
+        """Update the index from those of `tables` (Synapse IDs) which have
+        changed since it was last updated from them, querying them in
+        parallel with `executor` (by default, the executor returned by
+        `get_shared_executor`). Tables missing the externalId or healthCode
+        column are indexed as having no pairs if `continueOnMissingColumn`
+        is True. Returns the list of tables which were queried."""
+        from .tableHelpers import get_shared_executor
+
+        if executor is None:
+            executor = get_shared_executor()
+        tables = list(tables)
+        futures = [
+            executor.submit(self._refresh_table, syn, table_id, continueOnMissingColumn)
+            for table_id in tables
+        ]
+        return [table_id for table_id, f in zip(tables, futures) if f.result()]
+
+    def _refresh_table(self, syn, table_id, continueOnMissingColumn):
+        version = _table_version(syn, table_id)
+        if version is not None and version == self.version(table_id):
+            return False
+        try:
+            df = syn.tableQuery(IDENTITY_QUERY % table_id).asDataFrame()
+        except SynapseHTTPError as err:
+            if err.response.status_code == 400 and continueOnMissingColumn:
+                df = pd.DataFrame(columns=["externalId", "healthCode"])
+            else:
+                raise
+        if version is None:
+            # e.g. an entity view, which is queried again on every refresh
+            version = ""
+        self.update(table_id, version, df)
+        return True
+
+    def _lookup(self, column, other_column, values, tables):
+        values = [str(v) for v in set(values)]
+        batch_size = SQLITE_BATCH_SIZE
+        table_batches = [None]
+        if tables is not None:
+            # the values and tables of each statement share the parameter limit
+            batch_size = SQLITE_BATCH_SIZE // 2
+            tables = list(tables)
+            table_batches = [
+                tables[i : i + batch_size] for i in range(0, len(tables), batch_size)
+            ]
+        found = {}
+        with self._connect() as conn:
+            for table_batch in table_batches:
+                condition = ""
+                if table_batch is not None:
+                    condition = " AND table_id IN ({})".format(
+                        ",".join("?" * len(table_batch))
+                    )
+                for i in range(0, len(values), batch_size):
+                    batch = values[i : i + batch_size]
+                    rows = conn.execute(
+                        "SELECT DISTINCT {}, {} FROM identities "
+                        "WHERE {} IN ({}){}".format(
+                            column,
+                            other_column,
+                            column,
+                            ",".join("?" * len(batch)),
+                            condition,
+                        ),
+                        batch + (table_batch or []),
+                    )
+                    for value, other in rows:
+                        found.setdefault(value, set()).add(other)
+        return found
+
+    def health_codes(self, externalIds, tables=None):
+        """Return a dict mapping each of `externalIds` found in the index to
+        the set of its healthCodes, in `tables` if set."""
+        return self._lookup("external_id", "health_code", externalIds, tables)
+
+    def external_ids(self, healthCodes, tables=None):
+        """Return a dict mapping each of `healthCodes` found in the index to
+        the set of its externalIds, in `tables` if set."""
+        return self._lookup("health_code", "external_id", healthCodes, tables)
+
+    def mapping(self, tables=None):
+        """Return the distinct externalId and healthCode pairs indexed from
+        `tables` (by default, from every table) as a pandas DataFrame."""
+        query = "SELECT DISTINCT external_id, health_code FROM identities"
+        if tables is None:
+            with self._connect() as conn:
+                rows = conn.execute(query).fetchall()
+            return pd.DataFrame(rows, columns=["externalId", "healthCode"])
+        tables = list(tables)
+        rows = []
+        with self._connect() as conn:
+            for i in range(0, len(tables), SQLITE_BATCH_SIZE):
+                batch = tables[i : i + SQLITE_BATCH_SIZE]
+                rows.extend(
+                    conn.execute(
+                        query
+                        + " WHERE table_id IN ({})".format(",".join("?" * len(batch))),
+                        batch,
+                    )
+                )
+        mapping = pd.DataFrame(rows, columns=["externalId", "healthCode"])
+        # a pair may be in tables of different batches
+        return mapping.drop_duplicates(ignore_index=True)
+
+
+class ExternalIdIndex:
+    """An in-memory index of externalIds, for selecting cohorts of
+    participants by a prefix or substring of their externalId without
+    scanning every externalId.
+
+    The externalIds are kept sorted, so those with a given prefix are found
+    by binary search, and every substring of up to NGRAM_SIZE characters is
+    mapped to the externalIds containing it, so that only the externalIds
+    containing the rarest n-gram of a longer substring are checked.
+
+    Parameters
+    ----------
+    externalIds : array-like
+    healthCodes : array-like, default None
+        The healthCode of each of `externalIds` (so an externalId may be
+        repeated), e.g. the columns of the DataFrame returned by
+        `externalIds2healthCodes` or `IdentityIndex.mapping`, for
+        `health_codes`.
+    """
+
+    def __init__(self, externalIds, healthCodes=None):
+        self._health_codes = None
+        if healthCodes is not None:
+            self._health_codes = {}
+            for external_id, health_code in zip(externalIds, healthCodes):
+                if not pd.isna(external_id):  # keyed like self.externalIds
+                    self._health_codes.setdefault(str(external_id), []).append(
+                        health_code
+                    )
+            externalIds = self._health_codes
+        self.externalIds = sorted(set(str(i) for i in externalIds if not pd.isna(i)))
+        ngrams = {}
+        for position, external_id in enumerate(self.externalIds):
+            for ngram in self._ngrams(external_id):
+                ngrams.setdefault(ngram, []).append(position)
+        self._ngram_positions = {
+            ngram: array.array("L", positions) for ngram, positions in ngrams.items()
+        }
+
+    @staticmethod
+    def _ngrams(value):
+        return set(
+            value[start : start + size]
+            for size in range(1, NGRAM_SIZE + 1)
+            for start in range(len(value) - size + 1)
+        )
+
+    def prefix(self, value):
+        """Return the (sorted) externalIds starting with `value`."""
+        start = bisect.bisect_left(self.externalIds, value)
+        end = start
+        while end < len(self.externalIds) and self.externalIds[end].startswith(value):
+            end += 1
+        return self.externalIds[start:end]
+
+    def contains(self, value):
+        """Return the (sorted) externalIds containing `value`."""
+        if not value:
+            return list(self.externalIds)
+        if len(value) <= NGRAM_SIZE:
+            positions = self._ngram_positions.get(value, ())
+            return [self.externalIds[p] for p in positions]
+        candidates = min(
+            (
+                self._ngram_positions.get(value[start : start + NGRAM_SIZE], ())
+                for start in range(len(value) - NGRAM_SIZE + 1)
+            ),
+            key=len,
+        )
+        return [self.externalIds[p] for p in candidates if value in self.externalIds[p]]
+
+    def select(self, identifier_filter):
+        """Return the (sorted) externalIds which pass `identifier_filter`, an
+        IdentifierFilter or any other function of an externalId. Prefix,
+        Suffix and Contains filters, and Regex filters with a literal
+        prefix, are answered from the index.
+
+        The result may be passed as the `identifier` of `query_across_tables`,
+        which then only downloads the rows of exactly these externalIds."""
+        if isinstance(identifier_filter, Prefix):
+            return self.prefix(identifier_filter.value)
+        if isinstance(identifier_filter, Contains):
+            return self.contains(identifier_filter.value)
+        if isinstance(identifier_filter, Suffix):
+            candidates = self.contains(identifier_filter.value)
+        elif isinstance(identifier_filter, Regex):
+            candidates = self.prefix(identifier_filter.literal_prefix())
+        else:
+            candidates = self.externalIds
+        return [i for i in candidates if identifier_filter(i)]
+
+    def health_codes(self, externalIds):
+        """Return the distinct healthCodes of `externalIds`. Raises a
+        ValueError if the index was built without healthCodes."""
+        if self._health_codes is None:
+            raise ValueError(
+                "The index has no healthCodes, pass `healthCodes` "
+                "when building it."
+            )
+        health_codes = (
+            health_code
+            for external_id in externalIds
+            for health_code in self._health_codes.get(str(external_id), ())
+        )
+        return list(dict.fromkeys(health_codes))
@@ -0,0 +1,144 @@
+import time
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from .query_cache import _table_version
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CODE_QUERY = "select distinct healthCode from %s"
+
+
+class HealthCodeMembership:
+    """An in-memory record of which healthCodes have data in which Synapse
+    tables, for finding the tables with data of a cohort of participants
+    without querying the tables again for each cohort.
+
+    Each healthCode is assigned an integer, and the healthCodes of each
+    table are stored as a bitmap (a Python integer whose nth bit is set if
+    the table contains the healthCode assigned n). The number of
+    healthCodes of a cohort in a table is then the number of bits set in
+    the intersection of their bitmaps.
+
+    `refresh` checks the version of each table (see
+    `QueryResultCache.table_version`) and downloads the distinct healthCodes
+    of the tables which have changed since they were last downloaded.
+    `refresh_stale` only does so for the tables which haven't been
+    refreshed within the last `max_age` seconds, so that counting the
+    healthCodes of another cohort usually makes no requests at all.
+
+    Parameters
+    ----------
+    cache : synapsebridgehelpers.QueryResultCache, default None
+        If set, the healthCodes of tables are read from this cache, so that
+        they are only downloaded again once a table changes, even across
+        processes.
+    max_age : float, default 300
+        Seconds after which `refresh_stale` checks the version of a table
+        again (never, if None).
+    """
+
+    def __init__(self, cache=None, max_age=300):
+        self.cache = cache
+        self.max_age = max_age
+        self._ids = {}
+        self._bitmaps = {}
+        self._versions = {}
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def _assign_ids(self, healthCodes):
+        with self._lock:
+            ids = self._ids
+            for health_code in healthCodes:
+                ids.setdefault(health_code, len(ids))
+            return [ids[health_code] for health_code in healthCodes]
+
+    @staticmethod
+    def _to_bitmap(ids):
+        if len(ids) == 0:
+            return 0
+        bits = np.zeros(max(ids) + 1, dtype=bool)
+        bits[ids] = True
+        return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+    def bitmap(self, healthCodes):
+        """Return the bitmap of those of `healthCodes` which are in any of
+        the tables refreshed so far."""
+        with self._lock:
+            ids = [self._ids[h] for h in set(healthCodes) if h in self._ids]
+        return self._to_bitmap(ids)
+
+    def refresh(self, syn, tables, executor=None):
+        """Download the healthCodes of those of `tables` (Synapse IDs) which
+        have changed since they were last downloaded, in parallel with
+        `executor` (by default, the executor returned by
+        `get_shared_executor`). Returns the list of tables downloaded."""
+        from .tableHelpers import get_shared_executor
+
+        tables = list(tables)
+        if not tables:
+            return []
+        if executor is None:
+            executor = get_shared_executor()
+        futures = [
+            executor.submit(self._refresh_table, syn, table_id) for table_id in tables
+        ]
+        return [table_id for table_id, f in zip(tables, futures) if f.result()]
+
+    def refresh_stale(self, syn, tables, executor=None):
+        """Like `refresh`, but only for those of `tables` which have never
+        been refreshed or were last refreshed more than `max_age` seconds
+        ago. Returns the list of tables downloaded."""
+        with self._lock:
+            stale = [
+                table_id
+                for table_id in dict.fromkeys(tables)
+                if not self._is_fresh(self._checked.get(table_id))
+            ]
+        return self.refresh(syn, stale, executor=executor)
+
+    def _is_fresh(self, checked_at):
+        return checked_at is not None and (
+            self.max_age is None or time.time() - checked_at < self.max_age
+        )
+
+    def _refresh_table(self, syn, table_id):
+        checked_at = time.time()
+        if self.cache is not None:
+            # the cache then looks the healthCodes up under the same version
+            version = self.cache.table_version(syn, table_id, refresh=True)
+        else:
+            version = _table_version(syn, table_id)
+        with self._lock:
+            self._checked[table_id] = checked_at
+            known = table_id in self._bitmaps and self._versions[table_id] == version
+        if version is not None and known:
+            return False
+        query_str = HEALTH_CODE_QUERY % table_id
+        if self.cache is not None:
+            df = self.cache.query(syn, query_str)
+        else:
+            df = syn.tableQuery(query_str).asDataFrame()
+        self.update(table_id, version, df["healthCode"])
+        return True
+
+    def update(self, table_id, version, healthCodes):
+        """Record `healthCodes` as the healthCodes of `version` of a table."""
+        health_codes = pd.Series(healthCodes).dropna().to_numpy(dtype=object)
+        bitmap = self._to_bitmap(self._assign_ids(health_codes.tolist()))
+        with self._lock:
+            self._bitmaps[table_id] = bitmap
+            self._versions[table_id] = version
+            self._checked[table_id] = time.time()
+        logger.debug("Recorded %d healthCodes of %s", len(health_codes), table_id)
+
+    def counts(self, tables, healthCodes):
+        """Return the number of `healthCodes` in each of `tables`, which must
+        have been refreshed."""
+        cohort = self.bitmap(healthCodes)
+        with self._lock:
+            return [
+                bin(self._bitmaps[table_id] & cohort).count("1") for table_id in tables
+            ]
@@ -0,0 +1,224 @@
+import os
+import re
+import time
+import uuid
+import hashlib
+import logging
+import pandas as pd
+from .export_state import _SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 1024**3  # bytes
+DEFAULT_VERSION_MAX_AGE = 300  # seconds
+
+_TABLE_ID_PATTERN = re.compile(r"\bfrom\s+(syn\d+(?:\.\d+)?)\b", re.IGNORECASE)
+
+
+def _table_version(syn, table_id):
+    """Return a string identifying the current version of a Synapse table,
+    combining the etags of its schema and of its latest change set, or None
+    if it can't be determined (e.g. for an entity view)."""
+    if "." in table_id:  # snapshots can't change
+        return "snapshot"
+    schema = syn.get(table_id, downloadFile=False)
+    result = syn.tableQuery(
+        "select ROW_ID from {} limit 1".format(table_id), resultsAs="rowset"
+    )
+    if result.etag is None:
+        return None
+    return "{}:{}".format(schema.etag, result.etag)
+
+
+def _normalize_query(query_str):
+    """Collapse runs of whitespace, so that queries differing only in
+    formatting share a cache entry."""
+    return " ".join(query_str.split())
+
+
+class QueryResultCache(_SQLiteStore):
+    """A local cache of Synapse table query results, so that repeated
+    queries of tables which haven't changed are read from disk rather
+    than downloaded again.
+
+    Results are stored as pickled pandas DataFrames in `directory`, and are
+    indexed in a SQLite database by the queried table, the table's version
+    and the (whitespace normalized) query. The version of a table combines
+    the etag of its schema with the etag of its latest change set. The
+    version of each table is checked (with two requests) before its first
+    lookup and again once it was checked more than `version_max_age` seconds
+    ago, so a result may be returned for up to `version_max_age` seconds
+    after its table has changed. `invalidate` forgets the checked versions,
+    so that they are checked before the next lookup. Queries of table
+    snapshots (e.g. "syn123.4") are always cached, and queries of entity
+    views, which don't have a change set etag, are never cached.
+
+    Once the results take up more than `max_size` bytes, the least recently
+    used results are deleted.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to keep the cached results and their index in. It is
+        created if it does not exist.
+    max_size : int, default DEFAULT_MAX_SIZE
+        Size in bytes the cached results may take up.
+    version_max_age : float, default DEFAULT_VERSION_MAX_AGE
+        Seconds after which the version of a table is checked again (never,
+        if None, and before every lookup, if 0).
+    """
+
+    _schema = [
+        "CREATE TABLE IF NOT EXISTS query_results ("
+        "key TEXT PRIMARY KEY, table_id TEXT NOT NULL, "
+        "version TEXT NOT NULL, query TEXT NOT NULL, "
+        "filename TEXT NOT NULL, size INTEGER NOT NULL, "
+        "last_used REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS query_results_by_query "
+        "ON query_results (table_id, query)",
+    ]
+
+    def __init__(
+        self,
+        directory,
+        max_size=DEFAULT_MAX_SIZE,
+        version_max_age=DEFAULT_VERSION_MAX_AGE,
+    ):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_size = max_size
+        self.version_max_age = version_max_age
+        self._versions = {}
+        super().__init__(os.path.join(self.directory, "index.sqlite"))
+
+    def table_version(self, syn, table_id, refresh=False):
+        """Return a string identifying the current version of a Synapse
+        table, or None if it can't be determined. The version is only
+        checked again once it is older than `version_max_age` seconds or
+        `refresh` is requested."""
+        with self._lock:
+            entry = self._versions.get(table_id)
+        if (
+            entry is not None
+            and not refresh
+            and (
+                self.version_max_age is None
+                or time.time() - entry[0] < self.version_max_age
+            )
+        ):
+            return entry[1]
+        checked_at = time.time()
+        version = _table_version(syn, table_id)
+        with self._lock:
+            self._versions[table_id] = (checked_at, version)
+        return version
+
+    def invalidate(self, table_id=None):
+        """Forget the checked version of a table (or of every table), so
+        that it is checked again before the next lookup."""
+        with self._lock:
+            if table_id is None:
+                self._versions.clear()
+            else:
+                self._versions.pop(table_id, None)
+
+    def query(self, syn, query_str):
+        """Return the result of a Synapse table query as a pandas DataFrame,
+        from the cache if the queried table hasn't changed since the result
+        was cached."""
+        match = _TABLE_ID_PATTERN.search(query_str)
+        version = None
+        if match is not None:
+            table_id = match.group(1)
+            version = self.table_version(syn, table_id)
+        if version is None:
+            logger.debug("Not caching query: %s", query_str)
+            return syn.tableQuery(query_str).asDataFrame()
+        normalized_query = _normalize_query(query_str)
+        key = hashlib.sha256(
+            "\n".join([table_id, version, normalized_query]).encode("utf-8")
+        ).hexdigest()
+        df = self.get(key)
+        if df is not None:
+            logger.debug("Query cache hit: %s", query_str)
+            return df
+        logger.debug("Query cache miss: %s", query_str)
+        df = syn.tableQuery(query_str).asDataFrame()
+        self.put(key, table_id, version, normalized_query, df)
+        return df
+
+    def get(self, key):
+        """Return the DataFrame cached under `key`, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT filename FROM query_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE query_results SET last_used = ? WHERE key = ?",
+                (time.time(), key),
+            )
+        try:
+            return pd.read_pickle(os.path.join(self.directory, row[0]))
+        except FileNotFoundError:  # evicted by another process
+            return None
+
+    def put(self, key, table_id, version, query, df):
+        """Cache `df` under `key`, replacing any results of the same
+        query of an older version of the table."""
+        filename = "{}.pkl".format(uuid.uuid4().hex)
+        path = os.path.join(self.directory, filename)
+        df.to_pickle(path)
+        size = os.path.getsize(path)
+        with self._lock, self._connect() as conn:
+            stale = conn.execute(
+                "SELECT filename FROM query_results WHERE "
+                "(table_id = ? AND query = ? AND version != ?) OR key = ?",
+                (table_id, query, version, key),
+            ).fetchall()
+            conn.execute(
+                "DELETE FROM query_results WHERE "
+                "(table_id = ? AND query = ? AND version != ?) OR key = ?",
+                (table_id, query, version, key),
+            )
+            conn.execute(
+                "INSERT INTO query_results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, table_id, version, query, filename, size, time.time()),
+            )
+            stale.extend(self._evict(conn))
+        self._remove_files(f for (f,) in stale)
+
+    def _evict(self, conn):
+        """Delete the index entries of the least recently used results until
+        the rest fit in `max_size`, and return the files to remove."""
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM query_results"
+        ).fetchone()[0]
+        evicted = []
+        if total <= self.max_size:
+            return evicted
+        rows = conn.execute(
+            "SELECT key, filename, size FROM query_results ORDER BY last_used"
+        ).fetchall()
+        for key, filename, size in rows:
+            if total <= self.max_size:
+                break
+            conn.execute("DELETE FROM query_results WHERE key = ?", (key,))
+            evicted.append((filename,))
+            total -= size
+        logger.debug("Evicted %d query results from the cache", len(evicted))
+        return evicted
+
+    def _remove_files(self, filenames):
+        for filename in filenames:
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Delete every cached result."""
+        with self._lock, self._connect() as conn:
+            filenames = conn.execute("SELECT filename FROM query_results").fetchall()
+            conn.execute("DELETE FROM query_results")
+        self._remove_files(f for (f,) in filenames)
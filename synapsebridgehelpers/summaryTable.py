@@ -1,34 +1,119 @@
+import os
+import uuid
 import synapsebridgehelpers
 import synapseclient
-import pandas as pd
 
 DEFAULT_SUMMARY_COLUMNS = ['recordId', 'appVersion', 'phoneInfo', 'uploadDate', 'healthCode',
                            'externalId', 'dataGroups', 'createdOn', 'createdOnTimeZone',
                            'userSharingScope']
 
 
-def summarizeTables(syn, projectId, columns=DEFAULT_SUMMARY_COLUMNS):
+def summarizeTables(syn, projectId, columns=DEFAULT_SUMMARY_COLUMNS, cache=None,
+                    catalog=None, compact=False, executor=None, output_dir=None):
     """Summarizes all tables in a project by fetching the same columns from each table
     and concatenating the rows into a dataframe.
 
+    The tables are queried in parallel with `executor` (by default, the
+    executor returned by `get_shared_executor`).
+
     Arguments:
     - syn: a Synapse client object
     - projectID: synapse ID of the project we want to summarize
     - columns: list of columns we want in the summary table.  If no columns
     are given, then all columns are used.
+    - cache: a QueryResultCache to read the results of unchanged tables from
+    - catalog: a TableCatalog to look the tables of the project, and their
+    columns, up in
+    - compact: store repeated values (e.g. healthCodes and table names) as
+    categoricals and integers in the narrowest dtype, to save memory
+    - executor: the concurrent.futures.Executor to query the tables with
+    - output_dir: if set, rather than returning the summary as a dataframe,
+    write the summary of each table as soon as it has been queried to a
+    Parquet dataset in this directory, partitioned by originalTableId, and
+    return a pyarrow.dataset.Dataset of it (see below)
+
+    With `output_dir`, no more than one table per thread of `executor` is
+    held in memory at once. The summary of each table is written to
+    `output_dir`/originalTableId=<Synapse ID>/, replacing any summary of the
+    same table written before. Other files in `output_dir` are left alone
+    and are not part of the returned dataset.
+    Requires pyarrow. The dataset can be read lazily, e.g. with
+    dataset.to_batches(), or in full with dataset.to_table().to_pandas().
     """
 
-    all_tables = synapsebridgehelpers.get_tables(syn, projectId)
-    df_list = []
-    for table_id in all_tables['id']:
-        table_columns = [str(col.name) for col in syn.getTableColumns(table_id)]
-        available_columns = list(set(columns).intersection(table_columns))
-        columns_str = ','.join(available_columns)
-        df = syn.tableQuery('select %s from %s' % (columns_str, table_id))
-        df = df.asDataFrame()
-        schema = syn.get(table_id)
-        df['originalTableName'] = [schema.name for count in range(0, df.shape[0])]
-        df['originalTableId'] = [schema.id for count in range(0, df.shape[0])]
-        df_list.append(df)
-    df_main = pd.concat(df_list)
+    all_tables = synapsebridgehelpers.get_tables(syn, projectId, catalog=catalog)
+    if executor is None:
+        executor = synapsebridgehelpers.get_shared_executor()
+    if output_dir is not None:
+        return _write_summary_dataset(syn, all_tables, columns, cache, catalog,
+                                      compact, executor, output_dir)
+    futures = [executor.submit(_summarize_table, syn, table_id, columns, cache,
+                               catalog, compact)
+               for table_id in all_tables['id']]
+    frames = [(table_id, f.result())
+              for table_id, f in zip(all_tables['id'], futures)]
+    df_main = synapsebridgehelpers.combine_data_frames(
+        frames, source_col='originalTableId')
+    table_names = dict(zip(all_tables['id'], all_tables['name']))
+    df_main.insert(len(df_main.columns) - 1, 'originalTableName',
+                   df_main['originalTableId'].map(table_names))
+    if not compact:
+        df_main = df_main.astype({'originalTableName': object,
+                                  'originalTableId': object})
     return df_main
+
+
+def _summarize_table(syn, table_id, columns, cache, catalog, compact):
+    if catalog is not None:
+        table_columns = catalog.columns(syn, table_id)
+    else:
+        table_columns = [str(col.name) for col in syn.getTableColumns(table_id)]
+    available_columns = [col for col in columns if col in table_columns]
+    columns_str = ','.join(available_columns)
+    query = 'select %s from %s' % (columns_str, table_id)
+    if cache is not None:
+        df = cache.query(syn, query)
+    else:
+        df = syn.tableQuery(query).asDataFrame()
+    if compact:
+        df = synapsebridgehelpers.compact_dataframe(df)
+    return df
+
+
+def _write_summary_dataset(syn, all_tables, columns, cache, catalog, compact,
+                           executor, output_dir):
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+                'Writing the summary to a Parquet dataset requires pyarrow.') from e
+
+    def write_table(table_id, table_name):
+        df = _summarize_table(syn, table_id, columns, cache, catalog, compact)
+        df['originalTableName'] = table_name
+        if compact:
+            df['originalTableName'] = df['originalTableName'].astype('category')
+        partition = os.path.join(output_dir, 'originalTableId=%s' % table_id)
+        os.makedirs(partition, exist_ok=True)
+        for name in os.listdir(partition):
+            os.remove(os.path.join(partition, name))
+        path = os.path.join(partition, '%s.parquet' % uuid.uuid4().hex)
+        pa.parquet.write_table(
+                pa.Table.from_pandas(df, preserve_index=False), path)
+        return path
+
+    futures = [executor.submit(write_table, table_id, table_name)
+               for table_id, table_name in zip(all_tables['id'], all_tables['name'])]
+    paths = [f.result() for f in futures]
+    # tables may be missing columns, or store them with different types
+    schemas = [pa.parquet.read_schema(path) for path in paths]
+    schema = pa.unify_schemas(schemas or [pa.schema([])],
+                              promote_options='permissive').remove_metadata()
+    partitioning = pa.dataset.partitioning(
+            pa.schema([('originalTableId', pa.string())]), flavor='hive')
+    return pa.dataset.dataset(
+            paths, schema=schema.append(partitioning.schema.field(0)),
+            format='parquet', partitioning=partitioning,
+            partition_base_dir=output_dir)
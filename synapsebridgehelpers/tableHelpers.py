@@ -1,8 +1,51 @@
-import multiprocessing
+import re
+import time
+import threading
+import functools
+import concurrent.futures
 import synapseclient as sc
 import pandas as pd
+from .identifier_filters import IdentifierFilter
+from .compact import compact_dataframe, concat_compact, combine_data_frames
 
-def get_tables(syn, projectId, simpleNameFilters=[]):
+# number of threads in the executor shared by calls to query_across_tables
+DEFAULT_MAX_WORKERS = 8
+# identifiers per IN clause, larger lists are split across several queries
+MAX_IN_LIST_SIZE = 1000
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+# table names are versioned like "Tapping Activity-v3"
+_VERSION_PATTERN = re.compile(r'(.)(-v\d+)')
+_NAME_PATTERN = re.compile(r'([ -_a-z-A-Z\d]+)(-v\d+)')
+
+
+def get_shared_executor():
+    """Returns the concurrent.futures.ThreadPoolExecutor used by
+    `query_across_tables` when it isn't passed an executor. The executor is
+    created on first use with DEFAULT_MAX_WORKERS threads, which are reused
+    across calls until `shutdown_shared_executor` is called."""
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            _shared_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=DEFAULT_MAX_WORKERS,
+                    thread_name_prefix="query_across_tables")
+        return _shared_executor
+
+
+def shutdown_shared_executor(wait=True):
+    """Shut down the executor returned by `get_shared_executor`, releasing
+    its threads. A new executor is created if it is needed again.
+
+     Arguments:
+    - wait: whether to wait for pending queries to finish"""
+    global _shared_executor
+    with _shared_executor_lock:
+        executor, _shared_executor = _shared_executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+def get_tables(syn, projectId, simpleNameFilters=[], catalog=None):
     """Returns all the tables in a projects as a dataFrame with
     columns for synapseId, table names, Version and Simplified Name
 
@@ -10,15 +53,15 @@ def get_tables(syn, projectId, simpleNameFilters=[]):
     - syn: a Synapse client object
     - projectId: Synapse ID of the project we want tables from
     - simpleNameFilters: the strings that are to be
-    filtered out from the table names to create a simple name"""
+    filtered out from the table names to create a simple name
+    - catalog: a TableCatalog to look the tables of the project up in,
+    rather than listing them every time"""
 
-    tables = syn.getChildren(projectId, includeTypes=['table'])
-    tables = pd.DataFrame(list(tables))
-    # removing tables named 'parkinson-status' and 'parkinson-appVersion'
-    tables = tables[(tables['name'] != 'parkinson-status') &
-                    (tables['name'] != 'parkinson-appVersion')]
-    tables['version'] = tables['name'].str.extract('(.)(-v\d+)', expand=True)[1]
-    names = tables['name'].str.extract('([ -_a-z-A-Z\d]+)(-v\d+)', expand=True)[0]
+    if catalog is None:
+        tables = _parse_table_names(_list_tables(syn, projectId))
+    else:
+        tables = catalog.tables(syn, projectId)
+    names = tables.pop('baseName')
     print(names)
     for word in simpleNameFilters:
         names = [name.replace(word, '') for name in names]
@@ -26,22 +69,171 @@ def get_tables(syn, projectId, simpleNameFilters=[]):
     return tables
 
 
-def find_tables_with_data(syn, tables, healthCodes):
+def _list_tables(syn, projectId):
+    tables = syn.getChildren(projectId, includeTypes=['table'])
+    tables = pd.DataFrame(list(tables))
+    # removing tables named 'parkinson-status' and 'parkinson-appVersion'
+    return tables[(tables['name'] != 'parkinson-status') &
+                  (tables['name'] != 'parkinson-appVersion')]
+
+
+def _parse_table_names(tables):
+    """Add the version and the name without the version of each table."""
+    tables = tables.copy()
+    tables['version'] = tables['name'].str.extract(
+            _VERSION_PATTERN, expand=True)[1]
+    tables['baseName'] = tables['name'].str.extract(
+            _NAME_PATTERN, expand=True)[0]
+    return tables
+
+
+class TableCatalog:
+    """An in-memory catalog of the tables in Synapse projects, with their
+    names already parsed, for `get_tables`, and of the columns of tables.
+
+    The tables of a project are listed the first time they are looked up,
+    and again once the listing is older than `max_age` seconds (never, if
+    `max_age` is None) or `refresh` is requested. A project has no etag
+    which changes when its tables do, so tables added or removed within
+    `max_age` seconds of the last listing aren't seen until it is listed
+    again. Each listing is compared with the previous one by the
+    modifiedOn of each table, and only the tables which are new or were
+    modified are updated: their names are parsed again and their cached
+    columns are looked up again when they are next needed. The columns
+    of a table are otherwise looked up again once they are older than
+    `max_age` seconds.
+
+     Arguments:
+    - max_age: seconds after which the tables of a project are listed again"""
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._projects = {}
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, entry, refresh):
+        return (entry is not None and not refresh and
+                (self.max_age is None or time.time() - entry[0] < self.max_age))
+
+    def tables(self, syn, projectId, refresh=False):
+        """Returns the tables of a project as a dataFrame with the
+        columns returned by syn.getChildren, version and baseName."""
+        with self._lock:
+            entry = self._projects.get(projectId)
+        if self._is_fresh(entry, refresh):
+            return entry[1].copy()
+        listed_at = time.time()
+        tables = _list_tables(syn, projectId)
+        changed = set()
+        if entry is None:
+            tables = _parse_table_names(tables)
+        else:
+            previous = entry[1].set_index('id', drop=False)
+            unchanged = (tables['modifiedOn'].values ==
+                         previous['modifiedOn'].reindex(tables['id']).values)
+            reused = previous.loc[tables['id'][unchanged]]
+            reused.index = tables.index[unchanged]
+            changed = set(previous.index).difference(reused['id'])
+            tables = pd.concat([reused, _parse_table_names(tables[~unchanged])]
+                               ).loc[tables.index]
+        with self._lock:
+            self._projects[projectId] = (listed_at, tables)
+            for table_id in changed:  # modified or removed tables
+                self._columns.pop(table_id, None)
+        return tables.copy()
+
+    def columns(self, syn, table_id, refresh=False):
+        """Returns the names of the columns of a table."""
+        with self._lock:
+            entry = self._columns.get(table_id)
+        if self._is_fresh(entry, refresh):
+            return list(entry[1])
+        looked_up_at = time.time()
+        columns = [str(col.name) for col in syn.getTableColumns(table_id)]
+        with self._lock:
+            self._columns[table_id] = (looked_up_at, columns)
+        return list(columns)
+
+    def invalidate(self, projectId=None):
+        """Forget the tables of a project (or of every project) and their
+        columns, so that they are looked up again when they are next
+        needed."""
+        with self._lock:
+            if projectId is None:
+                self._projects.clear()
+                self._columns.clear()
+                return
+            entry = self._projects.pop(projectId, None)
+            if entry is not None:
+                for table_id in entry[1]['id']:
+                    self._columns.pop(table_id, None)
+
+
+def find_tables_with_data(syn, tables, healthCodes,
+                          max_in_list_size=MAX_IN_LIST_SIZE, executor=None,
+                          cache=None, membership=None):
     """Go through a list of tables and find those where there is data given a
     data frame with sought healthCodes.
 
+    The tables are queried in parallel with `executor` (by default, the
+    executor returned by `get_shared_executor`). More than
+    `max_in_list_size` healthCodes are counted in separate queries of at
+    most that many healthCodes each.
+
+    If `cache` (a QueryResultCache) is set, the distinct healthCodes of each
+    table are read from it instead, and are only downloaded again once the
+    table changes. The version of each table is checked at most once per
+    `cache.version_max_age` seconds. The healthCodes are then counted
+    locally, which is much faster when looking for several different sets
+    of healthCodes.
+
+    If `membership` (a HealthCodeMembership) is set, the healthCodes are
+    counted with its bitmaps instead, which is faster still. Only the tables
+    it hasn't refreshed within its `max_age` are checked for changes, so
+    counting another cohort usually makes no requests at all.
+
     Returns the tables data frame with an additional column containing the
     number of unique healthCodes found in each table."""
-    query = ("select count(distinct healthCode) from %s where healthCode in ('" +
-             "','".join(healthCodes) + "')")
-    counts = [syn.tableQuery(query % synId, resultsAs='rowset').asInteger() for
-              synId in tables['id']]
+    if executor is None:
+        executor = get_shared_executor()
+    healthCodes = list(dict.fromkeys(healthCodes))
+    if membership is not None:
+        membership.refresh_stale(syn, tables['id'], executor=executor)
+        counts = membership.counts(tables['id'], healthCodes)
+    elif cache is not None:
+        futures = [executor.submit(_table_health_codes, syn, synId, cache)
+                   for synId in tables['id']]
+        healthCodes = set(healthCodes)
+        counts = [len(healthCodes.intersection(f.result())) for f in futures]
+    else:
+        # each healthCode is in one chunk, so the distinct counts can be summed
+        queries = [("select count(distinct healthCode) from %s where healthCode in ('" +
+                    "','".join(chunk) + "')")
+                   for chunk in _chunks(healthCodes, max_in_list_size)]
+        futures = [[executor.submit(_count_query, syn, query % synId)
+                    for query in queries]
+                   for synId in tables['id']]
+        counts = [sum(f.result() for f in table_futures)
+                  for table_futures in futures]
     tables['healthCodeCounts'] = counts
     return tables
 
 
-def safe_query(query_str, syn, continueOnMissingColumn):
+def _count_query(syn, query_str):
+    return syn.tableQuery(query_str, resultsAs='rowset').asInteger()
+
+
+def _table_health_codes(syn, table_id, cache):
+    """The distinct healthCodes of a table, read from `cache`."""
+    df = cache.query(syn, "select distinct healthCode from %s" % table_id)
+    return df['healthCode'].dropna().values
+
+
+def safe_query(query_str, syn, continueOnMissingColumn, cache=None):
     try:
+        if cache is not None:
+            return cache.query(syn, query_str)
         return syn.tableQuery(query_str)
     except sc.core.exceptions.SynapseHTTPError as e:
         if e.response.status_code == 400 and continueOnMissingColumn:
@@ -50,11 +242,162 @@ def safe_query(query_str, syn, continueOnMissingColumn):
             raise sc.core.exceptions.SynapseHTTPError(
                     "Invalid query:\n\n{}".format(query_str)) from e
 
+def _chunks(values, size):
+    """Split a list into consecutive lists of at most `size` values."""
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def _quote_column(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _query_table(table_id, query_str, syn, continueOnMissingColumn, cache,
+                 columns, required_col, table_columns, compact=False):
+    """Run `query_str` on a table with `safe_query`, selecting those of
+    `columns` (and `required_col`) which are in the table if `columns`
+    is set. If `columns` is set or `compact` is True, the names and types
+    of the columns of each table are kept in the `table_columns` dict."""
+    if (columns is not None or compact) and table_id not in table_columns:
+        table_columns[table_id] = {
+                c.name: c.columnType for c in syn.getTableColumns(table_id)}
+    if columns is not None:
+        selected = [c for c in columns if c in table_columns[table_id]]
+        if (required_col is not None and required_col not in selected
+                and required_col in table_columns[table_id]):
+            selected.append(required_col)
+        if not selected:
+            if continueOnMissingColumn:
+                return
+            raise ValueError("None of the columns {} are in {}".format(
+                    columns, table_id))
+        query_str = query_str.replace(
+                "SELECT *", "SELECT {}".format(
+                    ", ".join(_quote_column(c) for c in selected)), 1)
+    return safe_query(query_str.format(table_id), syn,
+                      continueOnMissingColumn, cache)
+
+
+def _run_queries(tables, query_strs, executor, timeout, query_table):
+    """Run each query in `query_strs` on each table with `query_table` on
+    `executor`. Returns, in the same order as `tables`, a list of the
+    results of each table in the same order as `query_strs`."""
+    futures = [[executor.submit(query_table, t, q) for q in query_strs]
+               for t in tables]
+    try:
+        return [[f.result(timeout=timeout) for f in table_futures]
+                for table_futures in futures]
+    except BaseException:
+        for table_futures in futures:
+            for f in table_futures:
+                f.cancel()
+        raise
+
+def _build_query(query, substudy, identifier, substudy_col, identifier_col,
+                 as_data_frame, cache, max_in_list_size, columns):
+    """Build the query strings of `query_across_tables`, with an unassigned
+    string in place of the table in the from clause. There is more than one
+    query string if `identifier` is split across several IN clauses.
+
+    Returns
+    -------
+    A tuple (list of query strings, `identifier`), where a string
+    `identifier` is wrapped in a list and `identifier` is None if it
+    is an IdentifierFilter which doesn't need to be applied to the
+    query results.
+    """
+    if isinstance(query, str) and (substudy is not None or identifier is not None):
+        raise TypeError("If `query` is a string, no other filtering parameters "
+                        "may be set. If you want to enable other filtering "
+                        "parameters, do not use the `query` parameter or "
+                        "pass a list of SQL logical WHERE criteria "
+                        "to the `query` parameter.")
+    if isinstance(query, str) and columns is not None:
+        raise TypeError("If `query` is a string, `columns` may not be set.")
+    if cache is not None and not as_data_frame:
+        raise TypeError("If `cache` is set, `as_data_frame` must be True.")
+    if substudy is not None:
+        if isinstance(substudy, str):
+            substudy = [substudy]
+        substudy_list = ["{} LIKE '%{}%'".format(substudy_col, s) for s in substudy]
+        substudy_str = "({})".format(" OR ".join(substudy_list))
+    identifier_clauses = [None]
+    if identifier is not None:
+        if isinstance(identifier, str):
+            identifier = [identifier]
+        if isinstance(identifier, list):
+            identifier_chunks = [identifier]
+            if as_data_frame and len(identifier) > max_in_list_size:
+                # distinct chunks match distinct rows, so results can be concatenated
+                identifier_chunks = _chunks(list(dict.fromkeys(identifier)),
+                                            max_in_list_size)
+            identifier_clauses = ["{} IN ('{}')".format(
+                                      identifier_col, "', '".join(chunk))
+                                  for chunk in identifier_chunks]
+        elif isinstance(identifier, IdentifierFilter):
+            identifier_clauses = [identifier.sql(identifier_col)]
+            if identifier_clauses[0] is not None and identifier.exact:
+                identifier = None
+            elif not as_data_frame:
+                raise TypeError("If `identifier` can't be fully translated "
+                                "into SQL, `as_data_frame` must be True.")
+        elif callable(identifier):
+            if not as_data_frame:
+                raise TypeError("If `identifier` is a function, "
+                                "`as_data_frame` must be True.")
+    if isinstance(query, str):
+        return [query], identifier
+    query_strs = []
+    for identifier_clause in identifier_clauses:
+        query_str = "SELECT * FROM {}"
+        if (query is not None or substudy is not None
+                or identifier_clause is not None):
+            query_str = "{} WHERE".format(query_str)
+        if substudy is not None:
+            query_str = "{} {}".format(query_str, substudy_str)
+        if identifier_clause is not None:
+            if substudy is not None:
+                query_str = "{} AND".format(query_str)
+            query_str = "{} {}".format(query_str, identifier_clause)
+        if query is not None:
+            if substudy is not None or identifier_clause is not None:
+                query_str = "{} AND".format(query_str)
+            query_str = "{} {}".format(query_str, " AND ".join(query))
+        query_strs.append(query_str)
+    return query_strs, identifier
+
+
+def _as_data_frame(results, identifier, identifier_col, columns, compact,
+                   column_types=None):
+    """Convert the query results of a table to a single pandas DataFrame,
+    keeping only the rows whose `identifier_col` satisfies `identifier` if
+    it is a function. `column_types` maps the names of the table's columns
+    to their Synapse types, so that every chunk is compacted to the same
+    dtypes even if some chunks are empty."""
+    if any(result is None for result in results):
+        return
+    dfs = [result if isinstance(result, pd.DataFrame) else result.asDataFrame()
+           for result in results]
+    if compact:
+        dfs = [compact_dataframe(df, column_types=column_types) for df in dfs]
+        dfs = [df for df in dfs if len(df)] or dfs[:1]
+        df = dfs[0] if len(dfs) == 1 else concat_compact(dfs)
+    else:
+        df = dfs[0] if len(dfs) == 1 else pd.concat(dfs)
+    if callable(identifier):
+        df = df[list(map(identifier, df[identifier_col]))]
+        if columns is not None and identifier_col not in columns:
+            df = df.drop(identifier_col, axis=1)
+    return df
+
+
 def query_across_tables(syn, tables, query=None,
                         substudy=None, identifier=None,
                         substudy_col="substudyMemberships",
                         identifier_col="externalId", as_data_frame=True,
-                        continueOnMissingColumn=True):
+                        continueOnMissingColumn=True, executor=None,
+                        max_workers=None, timeout=None, cache=None,
+                        max_in_list_size=MAX_IN_LIST_SIZE, columns=None,
+                        compact=False, combine=False):
     """Retrieve all records that match a filtering criteria. Two convenience
     parameters (substudy and identifier) are provided to filter by one or more
     values of that respective parameter. The filtering criteria use logical
@@ -76,14 +419,21 @@ def query_across_tables(syn, tables, query=None,
     substudy : str or array-like
         Matches if `substudy_col` contains one or more of these arguments.
         (Uses SQL LIKE).
-    identifier : str, array-like, or function
+    identifier : str, array-like, function or IdentifierFilter
         Matches if `identifier_col` is equal to (str) or contained in (list)
-        or satisfies (function) this argument. For example:
+        or satisfies (function or IdentifierFilter) this argument. A function
+        is applied after downloading every row matching the other criteria,
+        whereas an IdentifierFilter (e.g. synapsebridgehelpers.Prefix) is
+        translated into SQL where possible. For example:
         identifier="ABC-123" -- matches iff `identifier_col` == "ABC-123"
         identifier=["ABC-123", "DEF-456"] -- matches iff
             `identifier_col` is in list ["ABC-123", "DEF-456"]
         identifier=lambda s : s.startswith("ABC") -- matches iff
             `identifier_col` starts with the string "ABC".
+        identifier=Prefix("ABC") -- as above, but only the matching rows
+            are downloaded.
+        identifier=externalId_index.select(Prefix("ABC")) -- as above, with
+            the matching identifiers looked up in an ExternalIdIndex.
     substudy_col : str, default "substudyMemberships"
         The column to reference for the `substudy` parameter.
     identifier_col : str, default "externalId"
@@ -94,63 +444,182 @@ def query_across_tables(syn, tables, query=None,
     continueOnMissingColumn : boolean, default True
         If one of the tables is missing a column that is being queried upon,
         return a None object rather than raising an exception.
+    executor : concurrent.futures.Executor, default None
+        The executor to run the queries with. It is not shut down
+        when this function returns. By default, the queries are run with
+        the executor returned by `get_shared_executor`, unless
+        `max_workers` is set.
+    max_workers : int, default None
+        If set (and `executor` is not), run the queries with a new
+        executor of at most this many threads, which is shut down
+        when this function returns.
+    timeout : float, default None
+        How many seconds to wait for the result of each query. If a
+        query doesn't finish in time, a concurrent.futures.TimeoutError
+        is raised and the queries which haven't started yet are cancelled.
+    cache : synapsebridgehelpers.QueryResultCache, default None
+        If set, read the results of tables which haven't changed since they
+        were last queried from this cache. `as_data_frame` must be True.
+    max_in_list_size : int, default MAX_IN_LIST_SIZE
+        If `identifier` is a list of more than this many (distinct) values,
+        query each table once per list of at most this many values, in
+        parallel, and concatenate the results. Only if `as_data_frame`
+        is True.
+    columns : array-like, default None
+        If set, select only these columns, rather than every column. Columns
+        which aren't in a table are left out of its result. A table with
+        none of these columns is treated like a table missing a queried
+        column (see `continueOnMissingColumn`). May not be set if `query`
+        is a string.
+    compact : boolean, default False
+        Reduce the memory used by the DataFrames with
+        `synapsebridgehelpers.compact_dataframe`, which stores the
+        columns in DEFAULT_CATEGORICAL_COLUMNS (e.g. healthCode) as
+        categoricals and integers in the narrowest possible dtype.
+    combine : boolean, default False
+        Return a single DataFrame combining the results of every table,
+        with an "originalTableId" column holding the Synapse ID of the
+        table each row came from, rather than a list of DataFrames. See
+        `synapsebridgehelpers.combine_data_frames`, which can also
+        combine the results into an Arrow backed DataFrame.
+        `as_data_frame` must be True.
 
     Returns
     -------
     A list of pandas DataFrames or synapseclient.table.CsvFileTable
-    (if as_data_frame = False).
+    (if as_data_frame = False), or a pandas DataFrame (if combine = True).
     """
-    filtered_tables = {}
-    if isinstance(query, str) and (substudy is not None or identifier is not None):
-        raise TypeError("If `query` is a string, no other filtering parameters "
-                        "may be set. If you want to enable other filtering "
-                        "parameters, do not use the `query` parameter or "
-                        "pass a list of SQL logical WHERE criteria "
-                        "to the `query` parameter.")
     if isinstance(tables, str):
         tables = [tables]
-    if substudy is not None:
-        if isinstance(substudy, str):
-            substudy = [substudy]
-        substudy_list = ["{} LIKE '%{}%'".format(substudy_col, s) for s in substudy]
-        substudy_str = "({})".format(" OR ".join(substudy_list))
-    if identifier is not None:
-        if isinstance(identifier, str):
-            identifier = [identifier]
-        if isinstance(identifier, list):
-            identifier_str = "('{}')".format("', '".join(identifier))
-        elif callable(identifier):
-            identifier_str = None
-            if not as_data_frame:
-                raise TypeError("If `identifier` is a function, "
-                                "`as_data_frame` must be True.")
-    if isinstance(query, str):
-        query_str = query
+    if combine and not as_data_frame:
+        raise TypeError("If `combine` is True, `as_data_frame` must be True.")
+    query_strs, identifier = _build_query(
+            query, substudy, identifier, substudy_col, identifier_col,
+            as_data_frame, cache, max_in_list_size, columns)
+    table_columns = {}
+    query_table = functools.partial(
+            _query_table, syn=syn,
+            continueOnMissingColumn=continueOnMissingColumn, cache=cache,
+            columns=columns,
+            required_col=identifier_col if callable(identifier) else None,
+            table_columns=table_columns, compact=compact and as_data_frame)
+    if executor is not None:
+        filtered_tables = _run_queries(
+                tables, query_strs, executor, timeout, query_table)
+    elif max_workers is not None:
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers) as executor:
+            filtered_tables = _run_queries(
+                    tables, query_strs, executor, timeout, query_table)
     else:
-        query_str = "SELECT * FROM {}"
-        if (query is not None or substudy is not None
-                or (identifier is not None and identifier_str is not None)):
-            query_str = "{} WHERE".format(query_str)
-        if substudy is not None:
-            query_str = "{} {}".format(query_str, substudy_str)
-        if (identifier is not None and identifier_col is not None
-                and identifier_str is not None):
-            if substudy is not None:
-                query_str = "{} AND".format(query_str)
-            query_str = "{} {} IN {}".format(
-                    query_str, identifier_col, identifier_str)
-        if query is not None:
-            if substudy is not None or identifier is not None:
-                query_str = "{} AND".format(query_str)
-            query_str = "{} {}".format(query_str, " AND ".join(query))
-    queries = [query_str.format(t) for t in tables]
-    mp = multiprocessing.dummy.Pool(8)
-    filtered_tables = mp.map(
-            lambda q : safe_query(q, syn, continueOnMissingColumn), queries)
+        filtered_tables = _run_queries(
+                tables, query_strs, get_shared_executor(), timeout,
+                query_table)
     if as_data_frame:
-        filtered_tables = [q.asDataFrame() for q in filtered_tables]
-        if callable(identifier):
-            filtered_tables = [df[list(map(identifier, df[identifier_col]))]
-                               for df in filtered_tables]
+        filtered_tables = [_as_data_frame(
+                               q, identifier, identifier_col, columns, compact,
+                               table_columns.get(t))
+                           for t, q in zip(tables, filtered_tables)]
+    else:
+        filtered_tables = [q[0] for q in filtered_tables]
+    if combine:
+        return combine_data_frames(list(zip(tables, filtered_tables)))
     return filtered_tables
 
+
+def iter_query_across_tables(syn, tables, query=None,
+                             substudy=None, identifier=None,
+                             substudy_col="substudyMemberships",
+                             identifier_col="externalId", as_data_frame=True,
+                             continueOnMissingColumn=True, executor=None,
+                             max_workers=None, timeout=None, cache=None,
+                             max_in_list_size=MAX_IN_LIST_SIZE, columns=None,
+                             compact=False):
+    """Like `query_across_tables`, but rather than returning a list once
+    every table has been queried, yield the result of each table as soon
+    as its query completes. Only the result being yielded is converted to
+    a pandas DataFrame, so at most one DataFrame is held at a time (unless
+    the caller keeps them). See `query_across_tables` for a description of
+    the parameters, except for:
+
+    timeout : float, default None
+        How many seconds to wait for the next query to complete. If no
+        query completes in time, a concurrent.futures.TimeoutError is raised.
+
+    Queries which haven't started yet are cancelled if the generator is
+    closed before it is exhausted.
+
+    Yields
+    ------
+    A tuple (Synapse ID, result) for each table in `tables`, in the
+    order their queries complete. The result is a pandas DataFrame,
+    a synapseclient.table.CsvFileTable (if as_data_frame = False),
+    or None (if the table is missing a queried column and
+    continueOnMissingColumn = True).
+    """
+    if isinstance(tables, str):
+        tables = [tables]
+    query_strs, identifier = _build_query(
+            query, substudy, identifier, substudy_col, identifier_col,
+            as_data_frame, cache, max_in_list_size, columns)
+    table_columns = {}
+    query_table = functools.partial(
+            _query_table, syn=syn,
+            continueOnMissingColumn=continueOnMissingColumn, cache=cache,
+            columns=columns,
+            required_col=identifier_col if callable(identifier) else None,
+            table_columns=table_columns, compact=compact and as_data_frame)
+    if executor is not None:
+        results = _iter_queries(tables, query_strs, executor, timeout,
+                                query_table)
+    elif max_workers is not None:
+        results = _iter_queries_with_new_executor(
+                tables, query_strs, max_workers, timeout, query_table)
+    else:
+        results = _iter_queries(tables, query_strs, get_shared_executor(),
+                                timeout, query_table)
+    for table_id, result in results:
+        if as_data_frame:
+            result = _as_data_frame(
+                    result, identifier, identifier_col, columns, compact,
+                    table_columns.get(table_id))
+        else:
+            result = result[0]
+        yield table_id, result
+
+
+def _iter_queries(tables, query_strs, executor, timeout, query_table):
+    """Run each query in `query_strs` on each table with `query_table` on
+    `executor` and yield (table ID, list of results) tuples in the order
+    the tables' queries complete."""
+    futures = {executor.submit(query_table, t, q): (t, i)
+               for t in tables for i, q in enumerate(query_strs)}
+    results = {t: [None] * len(query_strs) for t in tables}
+    remaining = {t: len(query_strs) for t in tables}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = concurrent.futures.wait(
+                    pending, timeout=timeout,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                raise concurrent.futures.TimeoutError(
+                        "No query completed within {} seconds".format(timeout))
+            for f in done:
+                table_id, i = futures[f]
+                results[table_id][i] = f.result()
+                remaining[table_id] -= 1
+                if remaining[table_id] == 0:
+                    yield table_id, results.pop(table_id)
+    finally:
+        for f in pending:
+            f.cancel()
+
+
+def _iter_queries_with_new_executor(tables, query_strs, max_workers, timeout,
+                                    query_table):
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers) as executor:
+        yield from _iter_queries(tables, query_strs, executor, timeout,
+                                 query_table)
+
@@ -3,17 +3,27 @@ import synapsebridgehelpers
 import numpy as np
 import pandas as pd
 
-def transferTables(syn,sourceProjId, uploadProjId, extId_Str = '', simpleNameFilters =[], healthCodeList=None):
+def transferTables(syn,sourceProjId, uploadProjId, extId_Str = '', simpleNameFilters =[], healthCodeList=None,
+                   catalog=None, identity_index=None, externalId_index=None):
     """ This function transfers tables from a source project to the upload project (target project) 
     sorted by external Ids which contain extId_Str, group tables with simpleNameFilters, also can filter
-    tables by healthcodes and then group by activity"""
+    tables by healthcodes and then group by activity. The tables of the source project
+    are looked up in `catalog` (a TableCatalog), if given, and their externalIds are
+    mapped to healthCodes with `identity_index` (an IdentityIndex), if given. If
+    `externalId_index` (an ExternalIdIndex of the externalIds and healthCodes of the
+    source project, built with their healthCodes) is given, the externalIds containing
+    extId_Str (as a substring, rather than a regular expression) are looked up in it
+    instead. A ValueError is raised if `externalId_index` has no healthCodes"""
 
     # dataframe of all tables using get_tables from synapsebridgehelper.tableHelpers
-    all_tables = synapsebridgehelpers.get_tables(syn,sourceProjId,simpleNameFilters)
+    all_tables = synapsebridgehelpers.get_tables(syn,sourceProjId,simpleNameFilters,catalog=catalog)
     
     # Converting externalIds to healthCodes
-    if extId_Str != '':
-        res = synapsebridgehelpers.externalIds2healthCodes(syn,list(all_tables['table.id']))
+    if extId_Str != '' and externalId_index is not None:
+        healthCodeList = externalId_index.health_codes(externalId_index.contains(extId_Str))
+    elif extId_Str != '':
+        res = synapsebridgehelpers.externalIds2healthCodes(syn,list(all_tables['table.id']),
+                                                           index=identity_index)
         res = res[res['externalId'].str.contains(extId_Str)]
         healthCodeList = list(res['healthCode'])
     
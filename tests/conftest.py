@@ -4,9 +4,31 @@ import pandas
 import tempfile
 import synapseclient
 import uuid
+from synapsebridgehelpers import (ExportWatermarkStore, FileHandleCopyCache,
+                                  QueryResultCache, IdentityIndex)
 
 SAMPLE_TABLE = "tests/sample_table.csv"
 
+@pytest.fixture
+def watermark_store(tmp_path):
+    return ExportWatermarkStore(str(tmp_path / "watermarks.sqlite"))
+
+
+@pytest.fixture
+def file_handle_cache(tmp_path):
+    return FileHandleCopyCache(str(tmp_path / "file_handles.sqlite"))
+
+
+@pytest.fixture
+def query_cache(tmp_path):
+    return QueryResultCache(str(tmp_path / "query_cache"), max_size=1024**2)
+
+
+@pytest.fixture
+def identity_index(tmp_path):
+    return IdentityIndex(str(tmp_path / "identities.sqlite"))
+
+
 @pytest.fixture(scope='session')
 def syn():
     syn = synapseclient.login()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from synapsebridgehelpers import (compact_dataframe, concat_compact,
+                                  combine_data_frames)
+
+
+def sample_df():
+    return pd.DataFrame({
+        "healthCode": ["a", "b", "a", None],
+        "recordId": ["1", "2", "3", "4"],
+        "count": [1, 2, 3, 4],
+        "score": [1.0, np.nan, 300.0, 4.0],
+        "flag": pd.Series([True, False, True, True], dtype=object)})
+
+
+def test_compact_dataframe():
+    df = sample_df()
+    result = compact_dataframe(df, column_types={"score": "INTEGER",
+                                                 "flag": "BOOLEAN"})
+    assert isinstance(result["healthCode"].dtype, pd.CategoricalDtype)
+    assert result["recordId"].dtype == df["recordId"].dtype
+    assert result["count"].dtype == np.int8
+    assert result["score"].dtype == "Int16"
+    assert result["flag"].dtype == bool
+    assert result["healthCode"].isna().sum() == 1
+    pd.testing.assert_frame_equal(
+        result.astype({"healthCode": object, "count": "int64",
+                       "score": "float64", "flag": object}),
+        df, check_dtype=False)
+
+
+def test_non_integer_values_unchanged():
+    df = pd.DataFrame({"score": [1.5, 2.0], "text": ["1", "x"]})
+    result = compact_dataframe(df, column_types={"score": "INTEGER",
+                                                 "text": "INTEGER"})
+    pd.testing.assert_frame_equal(result, df)
+
+
+def test_missing_integers_are_nullable():
+    df = pd.DataFrame({"score": pd.Series([None, None], dtype=object)})
+    result = compact_dataframe(df, column_types={"score": "INTEGER"})
+    assert result["score"].dtype == "Int8"
+    assert result["score"].isna().all()
+
+
+def test_concat_compact():
+    first = compact_dataframe(pd.DataFrame({"healthCode": ["a", "b"]}))
+    second = compact_dataframe(pd.DataFrame({"healthCode": ["c", "a"]}))
+    result = concat_compact([first, second])
+    assert isinstance(result["healthCode"].dtype, pd.CategoricalDtype)
+    assert list(result["healthCode"]) == ["a", "b", "c", "a"]
+
+
+def test_combine_data_frames():
+    first = compact_dataframe(sample_df())
+    second = compact_dataframe(sample_df().drop(columns="count").assign(
+        healthCode=["c", "a", "c", "c"]))
+    result = combine_data_frames([("syn1", first), ("syn2", None),
+                                  ("syn3", second)])
+    assert isinstance(result["healthCode"].dtype, pd.CategoricalDtype)
+    assert list(result["originalTableId"]) == ["syn1"] * 4 + ["syn3"] * 4
+    assert list(result["healthCode"].iloc[4:]) == ["c", "a", "c", "c"]
+    expected = pd.concat([sample_df(), sample_df().drop(columns="count")])
+    pd.testing.assert_frame_equal(
+        result.drop(columns=["originalTableId", "healthCode"]),
+        expected.drop(columns="healthCode"), check_dtype=False)
+
+
+def test_combine_mixed_integer_widths():
+    first = compact_dataframe(pd.DataFrame({"count": [1, None],
+                                            "score": [1, 2]}),
+                              column_types={"count": "INTEGER"})
+    second = compact_dataframe(pd.DataFrame({"count": [1000, 2000],
+                                             "score": [300, None]}),
+                               column_types={"score": "INTEGER"})
+    third = pd.DataFrame({"count": [1.5], "flag": [True]})
+    assert first["count"].dtype == "Int8" and second["count"].dtype == np.int16
+    assert first["score"].dtype == np.int8 and second["score"].dtype == "Int16"
+    result = combine_data_frames([("syn1", first), ("syn2", second)])
+    assert result["count"].dtype == "Int16"
+    assert result["score"].dtype == "Int16"
+    assert result["count"].isna().sum() == 1
+    assert list(result["score"].iloc[:3]) == [1, 2, 300]
+    result = combine_data_frames([("syn1", first), ("syn3", third)])
+    assert result["count"].dtype == "Float64"
+    assert result["score"].dtype == np.float64
+    assert result["flag"].dtype == object
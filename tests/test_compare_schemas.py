@@ -1,5 +1,8 @@
 import pytest
+import pandas as pd
+import synapseclient as sc
 from synapsebridgehelpers import compare_schemas
+from synapsebridgehelpers.export_tables import _ColumnFingerprint
 from copy import deepcopy
 
 def test_new_column(tables):
@@ -62,3 +65,24 @@ def test_error_on_renamed_file_column(tables, sample_table):
     print(target_table)
     with(pytest.raises(Exception)):
         compare_schemas(source_cols, target_cols, source_table, target_table)
+
+def test_fingerprint_matches_shifted_missing_values():
+    source = _ColumnFingerprint(pd.Series([1, 2, 3, None]))
+    target = _ColumnFingerprint(pd.Series([1, 2, 3, 4], dtype = "Int64"))
+    assert source.matches(target, 0.75)
+    assert not source.matches(target, 0.9)
+
+def test_fingerprint_unhashable_values():
+    source = _ColumnFingerprint(pd.Series([["a"], ["b", "c"], None]))
+    target = _ColumnFingerprint(pd.Series([["a"], ["b", "c"], ["d"]]))
+    assert source.matches(target, 0.6)
+    assert not source.matches(target, 0.9)
+
+def test_renamed_list_column():
+    source_cols = [sc.Column(name = "a", columnType = "STRING_LIST")]
+    target_cols = [sc.Column(name = "b", columnType = "STRING_LIST")]
+    source_table = pd.DataFrame({"a": [["x", "y"], ["z"], []]})
+    target_table = pd.DataFrame({"b": [["x", "y"], ["z"], []]})
+    result = compare_schemas(source_cols, target_cols,
+                             source_table, target_table)
+    assert result["renamed"] == {"b": "a"}
@@ -0,0 +1,60 @@
+import time
+import threading
+import pandas as pd
+import synapsebridgehelpers.getFileIds as getFileIds
+from synapsebridgehelpers import copyFileIdsInBatch
+
+
+class FakeCopyFileHandles:
+    """A stand-in for synapseutils.copyFileHandles which records each batch
+    and the time it was started. Earlier batches take longer to complete,
+    so that concurrent batches complete out of order."""
+
+    def __init__(self):
+        self.batches = []
+        self.started = []
+        self._lock = threading.Lock()
+
+    def __call__(self, syn, fileHandles, associateObjectTypes,
+                 associateObjectIds, newContentTypes, newFileNames):
+        with self._lock:
+            self.started.append(time.monotonic())
+            self.batches.append(list(fileHandles))
+            delay = 0.05 / len(self.batches)
+        time.sleep(delay)
+        return [{"newFileHandle": {"id": str(fhid + 1000)}} for fhid in fileHandles]
+
+
+def test_concurrent_batches_keep_order(monkeypatch):
+    copy = FakeCopyFileHandles()
+    monkeypatch.setattr(getFileIds.su, "copyFileHandles", copy)
+    fhids = list(range(350, 0, -1))
+    result = copyFileIdsInBatch(None, "syn1", pd.Series(fhids + [None, 1]),
+                                max_concurrent_batches = 4)
+    assert len(copy.batches) == 4
+    assert list(result) == fhids
+    assert all(result[k] == k + 1000 for k in fhids)
+
+
+def test_rate_limit(monkeypatch):
+    copy = FakeCopyFileHandles()
+    monkeypatch.setattr(getFileIds.su, "copyFileHandles", copy)
+    rate_limiter = getFileIds._RateLimiter(20)
+    # the limit applies across calls sharing a rate limiter
+    for fhids in [range(1, 201), range(201, 401)]:
+        copyFileIdsInBatch(None, "syn1", pd.Series(list(fhids)),
+                           max_concurrent_batches = 2, rate_limiter = rate_limiter)
+    assert len(copy.started) == 4
+    started = sorted(copy.started)
+    assert all(b - a >= 0.045 for a, b in zip(started, started[1:]))
+
+
+def test_cached_file_handles_are_not_copied(monkeypatch, file_handle_cache):
+    copy = FakeCopyFileHandles()
+    monkeypatch.setattr(getFileIds.su, "copyFileHandles", copy)
+    file_handle_cache.add("syn2", {1: 5001, 2: 5002})
+    result = copyFileIdsInBatch(None, "syn1", pd.Series([3, 2, 1]),
+                                cache = file_handle_cache, cache_scope = "syn2")
+    assert copy.batches == [[3]]
+    assert result == {3: 1003, 2: 5002, 1: 5001}
+    assert file_handle_cache.get("syn2", [3]) == {"3": "1003"}
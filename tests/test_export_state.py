@@ -0,0 +1,51 @@
+def test_no_checkpoint(watermark_store):
+    assert not watermark_store.has_checkpoint("syn1", "syn2", "recordId")
+
+
+def test_add_keys(watermark_store):
+    watermark_store.add_keys("syn1", "syn2", "recordId", ["a", "b"])
+    assert watermark_store.has_checkpoint("syn1", "syn2", "recordId")
+    assert watermark_store.existing_keys("syn1", "syn2", "recordId",
+                                         ["a", "c"]) == set(["a"])
+
+
+def test_empty_checkpoint(watermark_store):
+    watermark_store.add_keys("syn1", "syn2", "recordId", [])
+    assert watermark_store.has_checkpoint("syn1", "syn2", "recordId")
+
+
+def test_keys_scoped_by_pair(watermark_store):
+    watermark_store.add_keys("syn1", "syn2", "recordId", ["a"])
+    assert watermark_store.existing_keys("syn1", "syn3", "recordId", ["a"]) == set()
+    assert not watermark_store.has_checkpoint("syn1", "syn2", ["recordId", "healthCode"])
+
+
+def test_replace_keys(watermark_store):
+    watermark_store.add_keys("syn1", "syn2", "recordId", ["a", "b"])
+    watermark_store.replace_keys("syn1", "syn2", "recordId", ["c"])
+    assert watermark_store.existing_keys("syn1", "syn2", "recordId",
+                                         ["a", "b", "c"]) == set(["c"])
+
+
+def test_many_keys(watermark_store):
+    keys = [str(i) for i in range(2000)]
+    watermark_store.add_keys("syn1", "syn2", "recordId", keys)
+    assert watermark_store.existing_keys("syn1", "syn2", "recordId",
+                                         keys + ["x"]) == set(keys)
+
+
+def test_reset(watermark_store):
+    watermark_store.add_keys("syn1", "syn2", "recordId", ["a"])
+    watermark_store.reset("syn1", "syn2")
+    assert not watermark_store.has_checkpoint("syn1", "syn2", "recordId")
+    assert watermark_store.existing_keys("syn1", "syn2", "recordId", ["a"]) == set()
+
+
+def test_file_handle_cache_empty(file_handle_cache):
+    assert file_handle_cache.get("syn2", [1, 2]) == {}
+
+
+def test_file_handle_cache_add(file_handle_cache):
+    file_handle_cache.add("syn2", {1: 10, 2: 20})
+    assert file_handle_cache.get("syn2", [1, 3]) == {"1": "10"}
+    assert file_handle_cache.get("syn3", [1]) == {}
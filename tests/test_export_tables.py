@@ -1,8 +1,14 @@
+import re
 import pytest
+import requests
 import uuid
 import synapseclient as sc
 import pandas as pd
-from synapsebridgehelpers import export_tables
+from synapsebridgehelpers import (export_tables, ExportWatermarkStore,
+                                  TableExportError)
+from synapsebridgehelpers.export_tables import (
+        _export_to_new_table, _export_to_preexisting_table,
+        _store_dataframe_to_table, _truncate_table)
 from copy import deepcopy
 
 
@@ -53,6 +59,21 @@ def test_export_one_table_to_preexisting_update(syn, new_project, tables, sample
     print("correct result \n", correct_table_no_fh)
     pd.testing.assert_frame_equal(updated_table_no_fh, correct_table_no_fh)
 
+def test_export_one_table_to_new_chunk_size(syn, new_project, tables, sample_table):
+    source_table = tables["schema"][0]["id"]
+    exported_table = export_tables(
+            syn,
+            table_mapping = source_table,
+            target_project = new_project["id"],
+            chunk_size = 2)
+    new_table = syn.tableQuery(
+            "select * from {}".format(exported_table[source_table][0]))
+    new_table_no_fh = new_table.asDataFrame().reset_index(drop = True).drop(
+            "raw_data", axis = 1)
+    testing_table_no_fh = sample_table.drop(
+            "raw_data", axis = 1).reset_index(drop = True)
+    pd.testing.assert_frame_equal(new_table_no_fh, testing_table_no_fh)
+
 def test_export_one_table_to_preexisting_no_update(syn, new_project, tables, sample_table):
     source_table = tables["schema"][0]["id"]
     schema = sc.Schema(
@@ -91,6 +112,36 @@ def test_export_multiple_tables_to_new(syn, new_project, tables, sample_table):
     assert (exported_table_no_fh.equals(testing_table_no_fh) and
             exported_table_2_no_fh.equals(testing_table_no_fh))
 
+def test_export_multiple_tables_to_new_max_workers(syn, new_project, tables,
+                                                   sample_table):
+    source_table = tables["schema"][0]["id"]
+    source_table_2 = tables["schema"][1]["id"]
+    exported_table = export_tables(
+            syn,
+            table_mapping = [s["id"] for s in tables["schema"]],
+            target_project = new_project["id"],
+            max_workers = 2)
+    assert list(exported_table) == [source_table, source_table_2]
+    testing_table_no_fh = sample_table.drop(
+            "raw_data", axis = 1).reset_index(drop = True)
+    for source in [source_table, source_table_2]:
+        exported_table_no_fh = exported_table[source][1].drop(
+                "raw_data", axis = 1).reset_index(drop = True)
+        assert exported_table_no_fh.equals(testing_table_no_fh)
+
+def test_export_multiple_tables_max_workers_error(syn, new_project, tables):
+    source_table = tables["schema"][0]["id"]
+    table_bad_file_handles = "syn19002937" # User ID #3357179 owns these file handles
+    with pytest.raises(TableExportError) as e:
+        export_tables(
+                syn,
+                table_mapping = [source_table, table_bad_file_handles],
+                target_project = new_project["id"],
+                copy_file_handles = False,
+                max_workers = 2)
+    assert list(e.value.results) == [source_table]
+    assert list(e.value.errors) == [table_bad_file_handles]
+
 def test_export_multiple_tables_to_preexisting_update(syn, new_project,
                                                       tables, sample_table):
     source_table = tables["schema"][0]["id"]
@@ -136,6 +187,58 @@ def test_export_multiple_tables_to_preexisting_update(syn, new_project,
     assert (updated_table_no_fh.equals(correct_table_no_fh) and
             updated_table_2_no_fh.equals(correct_table_no_fh_2))
 
+def test_export_one_table_to_preexisting_key_only_scan(syn, new_project, tables,
+                                                       sample_table):
+    source_table = tables["schema"][0]["id"]
+    schema = sc.Schema(
+            name = tables["schema"][0]["name"],
+            columns = tables["columns"][0],
+            parent = new_project["id"])
+    incomplete_table = deepcopy(
+             sample_table.iloc[:len(sample_table)//2])
+    table = syn.store(sc.Table(schema, incomplete_table))
+    exported_table = export_tables(
+            syn,
+            table_mapping = {source_table: table.tableId},
+            update = True,
+            key_only_scan = True)
+    updated_table = syn.tableQuery("select * from {}".format(table.tableId))
+    updated_table = updated_table.asDataFrame().reset_index(drop = True)
+    updated_table_no_fh = updated_table.drop("raw_data", axis = 1)
+    update = exported_table[source_table][1]
+    correct_table_no_fh = incomplete_table.append(
+            update, ignore_index = True, sort = False)
+    correct_table_no_fh = correct_table_no_fh.drop(
+            "raw_data", axis = 1).reset_index(drop = True)
+    pd.testing.assert_frame_equal(updated_table_no_fh, correct_table_no_fh)
+
+def test_export_one_table_to_preexisting_watermark(syn, new_project, tables,
+                                                   sample_table, tmp_path):
+    source_table = tables["schema"][0]["id"]
+    schema = sc.Schema(
+            name = tables["schema"][0]["name"],
+            columns = tables["columns"][0],
+            parent = new_project["id"])
+    incomplete_table = deepcopy(
+             sample_table.iloc[:len(sample_table)//2])
+    table = syn.store(sc.Table(schema, incomplete_table))
+    watermark_store = ExportWatermarkStore(str(tmp_path / "watermarks.sqlite"))
+    exported_table = export_tables(
+            syn,
+            table_mapping = {source_table: table.tableId},
+            update = True,
+            watermark_store = watermark_store)
+    assert len(exported_table[source_table][1]) == \
+        len(sample_table) - len(incomplete_table)
+    exported_table = export_tables(
+            syn,
+            table_mapping = {source_table: table.tableId},
+            update = True,
+            watermark_store = watermark_store)
+    assert source_table not in exported_table
+    updated_table = syn.tableQuery("select * from {}".format(table.tableId))
+    assert len(updated_table.asDataFrame()) == len(sample_table)
+
 def test_table_mapping_exception(syn):
     with pytest.raises(TypeError):
         export_tables(syn, table_mapping = 42, update = True)
@@ -326,3 +429,188 @@ def test_export_file_handles_we_do_not_own_copy_none_new_table(syn, new_project,
             "raw_data", axis=1)
     correct_table_no_fh = sample_table.drop("raw_data", axis=1)
     pd.testing.assert_frame_equal(correct_table_no_fh, new_table_no_fh)
+
+
+class ChunkStoreSyn:
+    """A stand-in for synapseclient.Synapse which keeps stored table rows in
+    memory and raises an HTTP error with `status_code` when storing the
+    `fail_on`-th batch (counting from 1). If `applied` is True, the rows of
+    the failed batch are kept, as when Synapse applies a change but the
+    response is lost."""
+
+    def __init__(self, cols, fail_on, status_code=403, applied=False):
+        self.cols = cols
+        self.fail_on = fail_on
+        self.status_code = status_code
+        self.applied = applied
+        self.stores = 0
+        self.queries = 0
+        self.tables = {}
+        self.names = {}
+
+    def get(self, entity):
+        return {"id": entity, "name": "source table"}
+
+    def getTableColumns(self, table_id):
+        return self.cols
+
+    def findEntityId(self, name, parent):
+        return self.names.get((name, parent))
+
+    def tableQuery(self, query, resultsAs=None):
+        self.queries += 1
+        df = pd.DataFrame({"recordId": self.tables[query.split()[-1]]})
+        return type("Result", (), {"asDataFrame": lambda self: df})()
+
+    def store(self, obj, **kwargs):
+        self.stores += 1
+        table_id = obj.tableId
+        if table_id is None:
+            key = (obj.schema.name, obj.schema.parentId)
+            table_id = self.names.setdefault(key, "syn{}".format(len(self.names) + 1))
+        rows = self.tables.setdefault(table_id, [])
+        if self.stores == self.fail_on:
+            if self.applied:
+                rows.extend(obj.asDataFrame()["recordId"])
+            response = requests.Response()
+            response.status_code = self.status_code
+            raise sc.core.exceptions.SynapseHTTPError("failed", response=response)
+        rows.extend(obj.asDataFrame()["recordId"])
+        return sc.Table(table_id, obj.asDataFrame(), columns=self.cols)
+
+
+CHUNK_COLS = [sc.Column(name = "recordId", columnType = "STRING")]
+CHUNK_RECORDS = pd.DataFrame({"recordId": list("abcde")})
+
+def test_later_chunk_failure_resumes_new_table():
+    syn = ChunkStoreSyn(CHUNK_COLS, fail_on = 2)
+    table_id, records = _export_to_new_table(
+            syn,
+            source_id = "syn100",
+            source_table = CHUNK_RECORDS.copy(),
+            target_project = "syn200",
+            copy_file_handles = None,
+            chunk_size = 2)
+    assert table_id == "syn1"
+    assert list(syn.tables) == ["syn1"]
+    assert syn.tables["syn1"] == list("abcde")
+    assert list(records["recordId"]) == list("abcde")
+
+def test_later_chunk_failure_advances_watermark(watermark_store):
+    syn = ChunkStoreSyn(CHUNK_COLS, fail_on = 2)
+    syn.tables["syn2"] = []
+    watermark_store.add_keys("syn1", "syn2", "recordId", [])
+    with pytest.raises(sc.core.exceptions.SynapseHTTPError):
+        _export_to_preexisting_table(
+                syn,
+                source = "syn1",
+                target = "syn2",
+                source_table = CHUNK_RECORDS.copy(),
+                update = True,
+                reference_col = "recordId",
+                copy_file_handles = False,
+                watermark_store = watermark_store,
+                key_only_scan = False,
+                rename_sample_size = 1000,
+                chunk_size = 2)
+    assert syn.tables["syn2"] == list("ab")
+    assert watermark_store.existing_keys(
+            "syn1", "syn2", "recordId", list("abcde")) == set("ab")
+
+def test_applied_chunk_is_not_retried(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    syn = ChunkStoreSyn(CHUNK_COLS, fail_on = 2, status_code = 503,
+                        applied = True)
+    syn.tables["syn2"] = list("xy")
+    _store_dataframe_to_table(
+            syn,
+            df = CHUNK_RECORDS,
+            df_cols = CHUNK_COLS,
+            table_id = "syn2",
+            chunk_size = 2,
+            key_col = "recordId")
+    assert syn.tables["syn2"] == list("xyabcde")
+    assert syn.queries == 1
+
+def test_unapplied_chunk_is_retried(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    syn = ChunkStoreSyn(CHUNK_COLS, fail_on = 2, status_code = 503)
+    # more rows than the failed batch, so they can't be mistaken for it
+    syn.tables["syn2"] = list("vwxyz")
+    _store_dataframe_to_table(
+            syn,
+            df = CHUNK_RECORDS,
+            df_cols = CHUNK_COLS,
+            table_id = "syn2",
+            chunk_size = 2,
+            key_col = "recordId")
+    assert syn.tables["syn2"] == list("vwxyzabcde")
+
+def test_store_without_errors_makes_no_queries():
+    syn = ChunkStoreSyn(CHUNK_COLS, fail_on = None)
+    _store_dataframe_to_table(
+            syn,
+            df = CHUNK_RECORDS,
+            df_cols = CHUNK_COLS,
+            parent_id = "syn200",
+            table_name = "new table",
+            chunk_size = 2,
+            key_col = "recordId")
+    assert syn.stores == 3
+    assert syn.queries == 0
+
+def test_server_error_without_key_col_is_not_retried():
+    syn = ChunkStoreSyn(CHUNK_COLS, fail_on = 1, status_code = 503)
+    syn.tables["syn2"] = []
+    with pytest.raises(sc.core.exceptions.SynapseHTTPError):
+        _store_dataframe_to_table(
+                syn,
+                df = CHUNK_RECORDS,
+                df_cols = CHUNK_COLS,
+                table_id = "syn2")
+    assert syn.stores == 1
+
+
+class PagedSyn:
+    """A stand-in for synapseclient.Synapse holding the row IDs of one
+    table, which is emptied by someone else after `emptied_after` pages
+    have been deleted."""
+
+    def __init__(self, row_ids, emptied_after=None):
+        self.row_ids = list(row_ids)
+        self.emptied_after = emptied_after
+        self.queries = 0
+        self.deleted_pages = []
+
+    def tableQuery(self, query):
+        self.queries += 1
+        last_row_id = int(re.search(r"ROW_ID > (-?\d+)", query).group(1))
+        limit = int(re.search(r"limit (\d+)", query).group(1))
+        row_ids = sorted(i for i in self.row_ids if i > last_row_id)[:limit]
+        rows = [type("Row", (), {"row_id": i, "row_version": 1})()
+                for i in row_ids]
+        return type("Page", (), {"row_ids": row_ids,
+                                 "iter_row_metadata": lambda self: iter(rows)})()
+
+    def delete(self, page):
+        self.deleted_pages.append(page.row_ids)
+        self.row_ids = [i for i in self.row_ids if i not in page.row_ids]
+        if len(self.deleted_pages) == self.emptied_after:
+            self.row_ids = []
+
+
+@pytest.mark.parametrize("row_count", [0, 1, 9, 10, 11, 30])
+def test_truncate_table_pages(row_count):
+    syn = PagedSyn(range(0, 3 * row_count, 3))  # row IDs need not be consecutive
+    assert _truncate_table(syn, "syn1", page_size = 10) == row_count
+    assert syn.row_ids == []
+    assert [len(page) for page in syn.deleted_pages] == (
+            [10] * (row_count // 10) + [row_count % 10] * bool(row_count % 10))
+    assert syn.queries == len(syn.deleted_pages) + 1
+
+
+def test_truncate_table_emptied_partway():
+    syn = PagedSyn(range(25), emptied_after = 1)
+    assert _truncate_table(syn, "syn1", page_size = 10) == 10
+    assert syn.deleted_pages == [list(range(10))]
+    assert syn.queries == 2
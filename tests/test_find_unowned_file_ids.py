@@ -0,0 +1,14 @@
+from synapsebridgehelpers import findUnownedFileIds
+
+def test_owned_file_handles(syn, tables, sample_table):
+    source_table = tables["schema"][0]["id"]
+    result = findUnownedFileIds(syn, source_table, sample_table["raw_data"])
+    assert result == []
+
+def test_unowned_file_handles(syn):
+    table_bad_file_handles = "syn19002937" # User ID #3357179 owns these file handles
+    records = syn.tableQuery(
+            "select * from {}".format(table_bad_file_handles)).asDataFrame()
+    result = findUnownedFileIds(syn, table_bad_file_handles, records["raw_data"])
+    assert sorted(result) == sorted(
+            records["raw_data"].dropna().drop_duplicates().astype(int).tolist())
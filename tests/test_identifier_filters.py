@@ -0,0 +1,62 @@
+import pytest
+import numpy as np
+from synapsebridgehelpers import Prefix, Suffix, Contains, Range, Regex
+
+
+def test_prefix():
+    f = Prefix("AB")
+    assert f.sql("externalId") == "externalId LIKE 'AB%'"
+    assert f.exact
+    assert f("ABC") and not f("CAB") and not f(None)
+
+
+def test_suffix_quotes():
+    f = Suffix("o'k")
+    assert f.sql("externalId") == "externalId LIKE '%o''k'"
+    assert f("book'o'k")
+
+
+def test_contains_wildcard_not_exact():
+    f = Contains("A_B")
+    assert f.sql("externalId") == "externalId LIKE '%A_B%'"
+    assert not f.exact
+    assert f("xA_By") and not f("xAzBy")
+
+
+def test_range():
+    f = Range("A", "C")
+    assert f.sql("externalId") == "(externalId >= 'A' AND externalId < 'C')"
+    assert f("B") and not f("C")
+    assert Range(high=5, inclusive=True).sql("age") == "(age <= 5)"
+    with pytest.raises(TypeError):
+        Range()
+
+
+def test_range_numpy_scalars():
+    f = Range(np.int64(5), np.float64(7.5))
+    assert f.sql("age") == "(age >= 5 AND age < 7.5)"
+    assert f(6) and not f(8)
+    with pytest.raises(TypeError):
+        Range(True).sql("age")
+    with pytest.raises(TypeError):
+        Range(np.bool_(True)).sql("age")
+
+
+@pytest.mark.parametrize("value", [float("inf"), -np.inf, float("nan"),
+                                   np.float32("nan")])
+def test_range_non_finite(value):
+    with pytest.raises(ValueError):
+        Range(value).sql("age")
+    with pytest.raises(ValueError):
+        Range(high=value).sql("age")
+
+
+def test_regex_prefix():
+    assert Regex("^AB+C").sql("externalId") == "externalId LIKE 'AB%'"
+    assert Regex("^AB*C").sql("externalId") == "externalId LIKE 'A%'"
+    assert Regex("AB").sql("externalId") is None
+    assert Regex("^AB|CD").sql("externalId") is None
+    assert not Regex("^AB").exact
+    assert Regex("^AB+C").literal_prefix() == "AB"
+    assert Regex("AB").literal_prefix() == ""
+    assert Regex("^AB*C")("ACx") and not Regex("^AB*C")("XAC")
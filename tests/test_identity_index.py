@@ -0,0 +1,78 @@
+import pytest
+import pandas as pd
+from synapsebridgehelpers import IdentityIndex, ExternalIdIndex, Prefix, Suffix, Regex
+
+
+def sample_df():
+    return pd.DataFrame({"externalId": ["A", "A", "B", None],
+                         "healthCode": ["hc1", "hc2", "hc3", "hc4"]})
+
+
+def test_lookups(identity_index):
+    identity_index.update("syn1", "v1", sample_df())
+    identity_index.update("syn2", "v1", pd.DataFrame({"externalId": ["B"],
+                                                      "healthCode": ["hc5"]}))
+    assert identity_index.version("syn1") == "v1"
+    assert identity_index.version("syn3") is None
+    assert identity_index.health_codes(["A", "B", "C"]) == {
+        "A": {"hc1", "hc2"}, "B": {"hc3", "hc5"}}
+    assert identity_index.health_codes(["B"], tables=["syn2"]) == {"B": {"hc5"}}
+    assert identity_index.external_ids(["hc3", "hc4"]) == {"hc3": {"B"}}
+
+
+def test_update_replaces_table(identity_index):
+    identity_index.update("syn1", "v1", sample_df())
+    identity_index.update("syn1", "v2", pd.DataFrame({"externalId": ["C"],
+                                                      "healthCode": ["hc1"]}))
+    assert identity_index.version("syn1") == "v2"
+    mapping = identity_index.mapping(["syn1"])
+    assert mapping.values.tolist() == [["C", "hc1"]]
+
+
+def test_many_tables(identity_index):
+    tables = ["syn{}".format(i) for i in range(600)]
+    for table_id in tables:
+        identity_index.update(table_id, "v1", sample_df())
+    identity_index.update("syn5", "v2", pd.DataFrame({"externalId": ["C"],
+                                                      "healthCode": ["hc6"]}))
+    assert len(identity_index.mapping(tables)) == 4
+    assert identity_index.health_codes(["A", "C"], tables=tables) == {
+        "A": {"hc1", "hc2"}, "C": {"hc6"}}
+    assert identity_index.health_codes(["A"], tables=[]) == {}
+
+
+def test_persists(identity_index):
+    identity_index.update("syn1", "v1", sample_df())
+    index = IdentityIndex(identity_index.path)
+    assert len(index.mapping()) == 3
+
+
+def test_external_id_index():
+    index = ExternalIdIndex(["BOS-001", "BOS-002", "NYC-001", "NYC-012", None],
+                            ["hc1", "hc2", "hc3", "hc4", "hc5"])
+    assert index.prefix("BOS") == ["BOS-001", "BOS-002"]
+    assert index.prefix("SEA") == []
+    assert index.contains("01") == ["BOS-001", "NYC-001", "NYC-012"]
+    assert index.contains("C-01") == ["NYC-012"]
+    assert index.select(Prefix("NYC")) == ["NYC-001", "NYC-012"]
+    assert index.select(Suffix("-001")) == ["BOS-001", "NYC-001"]
+    assert index.select(Regex("^NYC-0[01]2")) == ["NYC-012"]
+    assert index.select(lambda s: s.endswith("2")) == ["BOS-002", "NYC-012"]
+    assert index.health_codes(index.prefix("NYC")) == ["hc3", "hc4"]
+
+
+def test_external_id_index_numeric_ids():
+    index = ExternalIdIndex([101, 102, 201, float("nan")],
+                            ["hc1", "hc2", "hc3", "hc4"])
+    assert index.prefix("10") == ["101", "102"]
+    assert index.health_codes(index.prefix("10")) == ["hc1", "hc2"]
+    assert index.health_codes([201]) == ["hc3"]
+    assert index.health_codes([float("nan")]) == []
+
+
+def test_external_id_index_without_health_codes():
+    index = ExternalIdIndex(["BOS-001", "NYC-001"])
+    assert index.contains("001") == ["BOS-001", "NYC-001"]
+    with pytest.raises(ValueError):
+        index.health_codes(["BOS-001"])
+    assert ExternalIdIndex([], []).health_codes(["BOS-001"]) == []
@@ -0,0 +1,62 @@
+import re
+import pandas as pd
+from synapsebridgehelpers import HealthCodeMembership, find_tables_with_data
+
+
+def test_counts():
+    membership = HealthCodeMembership()
+    membership.update("syn1", "v1", ["hc1", "hc2", "hc3", None])
+    membership.update("syn2", "v1", ["hc3", "hc4"])
+    membership.update("syn3", "v1", [])
+    assert membership.counts(["syn1", "syn2", "syn3"], ["hc2", "hc3", "hc5"]) == [2, 1, 0]
+    assert membership.counts(["syn1"], []) == [0]
+
+
+def test_update_replaces_table():
+    membership = HealthCodeMembership()
+    membership.update("syn1", "v1", ["hc1", "hc2"])
+    membership.update("syn1", "v2", ["hc3"])
+    assert membership.counts(["syn1"], ["hc1", "hc2", "hc3"]) == [1]
+
+
+class CountingSyn:
+    """A stand-in for synapseclient.Synapse which counts requests and
+    returns the same version of every table."""
+
+    def __init__(self, health_codes):
+        self.health_codes = health_codes
+        self.requests = 0
+
+    def get(self, entity, downloadFile=True):
+        self.requests += 1
+        return type("Schema", (), {"etag": "schema-etag"})()
+
+    def tableQuery(self, query, resultsAs=None):
+        self.requests += 1
+        table_id = re.search(r"syn\d+", query).group(0)
+        df = pd.DataFrame({"healthCode": self.health_codes[table_id]})
+        return type("Result", (), {"etag": "rows-etag",
+                                   "asDataFrame": lambda self: df})()
+
+
+def test_counts_without_requests():
+    syn = CountingSyn({"syn1": ["hc1", "hc2"], "syn2": ["hc2", "hc3"]})
+    tables = pd.DataFrame({"id": ["syn1", "syn2"]})
+    membership = HealthCodeMembership()
+    result = find_tables_with_data(syn, tables, ["hc1", "hc2"],
+                                   membership=membership)
+    assert list(result["healthCodeCounts"]) == [2, 1]
+    assert syn.requests == 6  # version check and query of each table
+    result = find_tables_with_data(syn, tables, ["hc3"], membership=membership)
+    assert list(result["healthCodeCounts"]) == [0, 1]
+    assert syn.requests == 6
+    assert membership.refresh(syn, ["syn1", "syn2"]) == []
+    assert syn.requests == 10  # version checks only
+
+
+def test_max_age():
+    syn = CountingSyn({"syn1": ["hc1"]})
+    membership = HealthCodeMembership(max_age=0)
+    membership.refresh_stale(syn, ["syn1"])
+    assert membership.refresh_stale(syn, ["syn1"]) == []
+    assert syn.requests == 5
@@ -1,6 +1,9 @@
+import concurrent.futures
 import pytest
 import pandas as pd
-from synapsebridgehelpers import query_across_tables
+import synapseclient as sc
+from synapsebridgehelpers import (query_across_tables, iter_query_across_tables,
+                                  Prefix, Regex)
 
 def test_str_query(syn, tables, sample_table):
     result = query_across_tables(
@@ -135,3 +138,96 @@ def test_mix_everything(syn, tables, sample_table):
     reference = reference.reset_index(drop=True)
     assert (result[0].reset_index(drop=True).equals(reference) and
             result[1].reset_index(drop=True).equals(reference))
+
+
+def test_max_workers(syn, tables, sample_table):
+    result = query_across_tables(
+            syn,
+            tables = [s["id"] for s in tables["schema"]],
+            max_workers = 1)
+    reference = sample_table.reset_index(drop=True)
+    assert (result[0].reset_index(drop=True).equals(reference) and
+            result[1].reset_index(drop=True).equals(reference))
+
+
+def test_executor(syn, tables, sample_table):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        result = query_across_tables(
+                syn,
+                tables = [s["id"] for s in tables["schema"]],
+                executor = executor)
+        # the executor is left open for the caller to reuse
+        assert executor.submit(lambda : 1).result() == 1
+    reference = sample_table.reset_index(drop=True)
+    assert (result[0].reset_index(drop=True).equals(reference) and
+            result[1].reset_index(drop=True).equals(reference))
+
+
+def test_iter_two_tables(syn, tables, sample_table):
+    table_ids = [s["id"] for s in tables["schema"]]
+    result = dict(iter_query_across_tables(syn, tables = table_ids))
+    reference = sample_table.reset_index(drop=True)
+    assert set(result) == set(table_ids)
+    assert all(df.reset_index(drop=True).equals(reference)
+               for df in result.values())
+
+
+def test_chunked_identifier(syn, tables, sample_table):
+    result = query_across_tables(syn, tables = tables["schema"][0]["id"],
+                        identifier = ["ABC", "FGH", "ABC"],
+                        max_in_list_size = 1)
+    reference = sample_table.query("externalId == 'ABC' or "
+                                   "externalId == 'FGH'")
+    assert (sorted(result[0].externalId) == sorted(reference.externalId))
+
+
+def test_one_table_prefix_identifier(syn, tables, sample_table):
+    result = query_across_tables(syn, tables = tables["schema"][0]["id"],
+                        identifier = Prefix("A"))
+    reference = sample_table[[s.startswith("A") for s in sample_table.externalId]]
+    reference = reference.reset_index(drop=True)
+    pd.testing.assert_frame_equal(result[0].reset_index(drop=True), reference)
+
+
+def test_one_table_regex_identifier(syn, tables, sample_table):
+    result = query_across_tables(syn, tables = tables["schema"][0]["id"],
+                        identifier = Regex("^A.*C$"))
+    reference = sample_table[[s.startswith("A") and s.endswith("C")
+                              for s in sample_table.externalId]]
+    reference = reference.reset_index(drop=True)
+    pd.testing.assert_frame_equal(result[0].reset_index(drop=True), reference)
+
+
+def test_columns(syn, tables, sample_table):
+    result = query_across_tables(syn, tables = tables["schema"][0]["id"],
+                        columns = ["str_property", "not_a_column"],
+                        identifier = "ABC")
+    reference = sample_table.query("externalId == 'ABC'")[["str_property"]]
+    reference = reference.reset_index(drop=True)
+    pd.testing.assert_frame_equal(result[0].reset_index(drop=True), reference)
+
+
+class ChunkedSyn:
+    """A stand-in for synapseclient.Synapse whose table only has records
+    for the externalId "ABC", with a missing score."""
+
+    def getTableColumns(self, table_id):
+        return [sc.Column(name="externalId", columnType="STRING"),
+                sc.Column(name="score", columnType="INTEGER")]
+
+    def tableQuery(self, query):
+        df = pd.DataFrame({"externalId": pd.Series([], dtype=object),
+                           "score": pd.Series([], dtype=object)})
+        if "'ABC'" in query:
+            df = pd.DataFrame({"externalId": ["ABC"],
+                               "score": pd.Series([None], dtype=object)})
+        return type("Result", (), {"asDataFrame": lambda self: df})()
+
+
+def test_compact_chunks_share_dtypes():
+    for identifier in [["ABC"], ["ABC", "DEF", "GHI"]]:
+        result = query_across_tables(ChunkedSyn(), tables = "syn1",
+                                     identifier = identifier,
+                                     max_in_list_size = 1, compact = True)
+        assert result[0]["score"].dtype == "Int8"
+        assert len(result[0]) == 1
@@ -0,0 +1,86 @@
+import os
+import pandas as pd
+from synapsebridgehelpers import QueryResultCache
+
+
+def sample_df(n=10):
+    return pd.DataFrame({"healthCode": ["hc{}".format(i) for i in range(n)],
+                         "value": range(n)})
+
+
+def test_get_missing(query_cache):
+    assert query_cache.get("a") is None
+
+
+def test_put_get(query_cache):
+    df = sample_df()
+    query_cache.put("a", "syn1", "v1", "select * from syn1", df)
+    pd.testing.assert_frame_equal(query_cache.get("a"), df)
+
+
+def test_new_version_replaces_old(query_cache):
+    query_cache.put("a", "syn1", "v1", "select * from syn1", sample_df())
+    query_cache.put("b", "syn1", "v2", "select * from syn1", sample_df(5))
+    assert query_cache.get("a") is None
+    assert len(query_cache.get("b")) == 5
+    assert len(os.listdir(query_cache.directory)) == 2  # index and one result
+
+
+def test_lru_eviction(query_cache):
+    df = sample_df(1000)
+    cache = query_cache
+    cache.put("a", "syn1", "v1", "select * from syn1", df)
+    size = os.path.getsize(os.path.join(
+        cache.directory, [f for f in os.listdir(cache.directory)
+                          if f.endswith(".pkl")][0]))
+    cache = QueryResultCache(cache.directory, max_size=int(size * 2.5))
+    cache.put("b", "syn2", "v1", "select * from syn2", df)
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", "syn3", "v1", "select * from syn3", df)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_clear(query_cache):
+    query_cache.put("a", "syn1", "v1", "select * from syn1", sample_df())
+    query_cache.clear()
+    assert query_cache.get("a") is None
+
+
+class CountingSyn:
+    """A stand-in for synapseclient.Synapse which counts requests and
+    returns the same version of every table."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def get(self, entity, downloadFile=True):
+        self.requests += 1
+        return type("Schema", (), {"etag": "schema-etag"})()
+
+    def tableQuery(self, query, resultsAs=None):
+        self.requests += 1
+        df = sample_df()
+        return type("Result", (), {"etag": "rows-etag",
+                                   "asDataFrame": lambda self: df})()
+
+
+def test_hit_makes_no_requests(query_cache):
+    syn = CountingSyn()
+    query_cache.query(syn, "select * from syn1")
+    assert syn.requests == 3  # version check and query
+    pd.testing.assert_frame_equal(
+        query_cache.query(syn, "select  * from syn1"), sample_df())
+    assert syn.requests == 3
+    query_cache.invalidate("syn1")
+    query_cache.query(syn, "select * from syn1")
+    assert syn.requests == 5  # version check only
+
+
+def test_version_max_age(tmp_path):
+    cache = QueryResultCache(str(tmp_path), version_max_age=0)
+    syn = CountingSyn()
+    cache.query(syn, "select * from syn1")
+    cache.query(syn, "select * from syn1")
+    assert syn.requests == 5
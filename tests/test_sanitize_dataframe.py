@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import synapseclient as sc
+from synapsebridgehelpers.export_tables import (
+        _sanitize_dataframe, parse_number_to_string)
+
+COLS = [sc.Column(name="recordId", columnType="STRING"),
+        sc.Column(name="count", columnType="INTEGER"),
+        sc.Column(name="createdOn", columnType="DATE"),
+        sc.Column(name="raw_data", columnType="FILEHANDLEID"),
+        sc.Column(name="score", columnType="DOUBLE")]
+
+def records():
+    return pd.DataFrame({
+            "recordId": ["a", "b", "c", "d"],
+            "count": [1.0, np.nan, 3.0, -0.0],
+            "createdOn": [1546300800000, 1546387200000, 1546473600000, 0],
+            "raw_data": [1e20, 123456.0, 2.5, np.nan],
+            "score": [1.0, 2.0, np.nan, 4.5]},
+            index = ["1_1", "2_1", "3_1", "4_1"])
+
+def test_same_as_parse_number_to_string():
+    result = _sanitize_dataframe(None, records(), cols=COLS)
+    for c in ["count", "createdOn", "raw_data"]:
+        assert list(result[c]) == list(map(parse_number_to_string, records()[c]))
+
+def test_other_columns_unchanged():
+    result = _sanitize_dataframe(None, records(), cols=COLS)
+    pd.testing.assert_series_equal(
+            result["score"], records()["score"].reset_index(drop=True))
+    assert list(result["recordId"]) == ["a", "b", "c", "d"]
+
+def test_nullable_integers():
+    df = pd.DataFrame({"count": pd.array([1, None, 3], dtype="Int64")})
+    result = _sanitize_dataframe(None, df, cols=COLS[1:2])
+    assert list(result["count"]) == ["1", None, "3"]
@@ -0,0 +1,52 @@
+import synapseclient as sc
+from synapsebridgehelpers import TableCatalog
+
+
+class ProjectSyn:
+    """A stand-in for synapseclient.Synapse with a single project whose
+    tables can be changed, which counts the columns looked up."""
+
+    def __init__(self, children):
+        self.children = children
+        self.column_lookups = []
+
+    def getChildren(self, parent, includeTypes=None):
+        return iter([dict(c) for c in self.children])
+
+    def getTableColumns(self, table_id):
+        self.column_lookups.append(table_id)
+        return [sc.Column(name="recordId", columnType="STRING")]
+
+
+def table(table_id, name, modified_on="2020-01-01"):
+    return {"id": table_id, "name": name, "modifiedOn": modified_on,
+            "type": "org.sagebionetworks.repo.model.table.TableEntity"}
+
+
+def test_only_changed_tables_are_updated():
+    syn = ProjectSyn([table("syn1", "Tapping-v1"), table("syn2", "Walking-v2")])
+    catalog = TableCatalog(max_age=None)
+    catalog.tables(syn, "syn0")
+    catalog.columns(syn, "syn1")
+    catalog.columns(syn, "syn2")
+    syn.children = [table("syn3", "Voice-v1"),
+                    table("syn2", "Walking Renamed-v3", "2020-02-01"),
+                    table("syn1", "Tapping-v1")]
+    tables = catalog.tables(syn, "syn0", refresh=True)
+    assert tables["id"].tolist() == ["syn3", "syn2", "syn1"]
+    assert tables["baseName"].tolist() == ["Voice", "Walking Renamed", "Tapping"]
+    assert tables["version"].tolist() == ["-v1", "-v3", "-v1"]
+    catalog.columns(syn, "syn1")
+    catalog.columns(syn, "syn2")
+    assert syn.column_lookups == ["syn1", "syn2", "syn2"]
+
+
+def test_removed_table_columns_are_forgotten():
+    syn = ProjectSyn([table("syn1", "Tapping-v1"), table("syn2", "Walking-v2")])
+    catalog = TableCatalog(max_age=None)
+    catalog.tables(syn, "syn0")
+    catalog.columns(syn, "syn2")
+    syn.children = [table("syn1", "Tapping-v1")]
+    assert catalog.tables(syn, "syn0", refresh=True)["id"].tolist() == ["syn1"]
+    catalog.columns(syn, "syn2")
+    assert syn.column_lookups == ["syn2", "syn2"]